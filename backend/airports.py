@@ -0,0 +1,207 @@
+# file:         airports.py
+# description:  local airport index, replacing live geocoding. Airports are read once from a CSV in the OurAirports
+#               layout (the bundled data/airports.csv or a full download from ourairports.com), compiled to a NumPy
+#               table next to it and memory-mapped on later starts. Supports lookup by ICAO, IATA or ident code,
+#               search by name, nearest airport to a lat/lon and cached per-airport bounding boxes.
+
+import csv
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+import geodesy
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(__file__), "data", "airports.csv")
+# bounding boxes kept per index, the distance comes from clients so the cache has to be bounded
+MAX_BBOXES = 1024
+
+_DTYPE = np.dtype(
+    [
+        ("ident", "S8"),
+        ("icao", "S4"),
+        ("iata", "S3"),
+        ("name", "S96"),
+        ("lat", "<f8"),
+        ("lon", "<f8"),
+    ]
+)
+
+
+class Airport:
+    """
+    One airport of an AirportIndex.
+    """
+
+    __slots__ = ("ident", "icao", "iata", "name", "lat", "lon")
+
+    def __init__(self, ident, icao, iata, name, lat, lon):
+        self.ident = ident
+        self.icao = icao
+        self.iata = iata
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+
+    def __repr__(self):
+        return f"Airport({self.icao or self.ident}, {self.iata}, {self.name!r}, {self.lat}, {self.lon})"
+
+
+class AirportIndex:
+    """
+    Airports held in one structured NumPy array, with a dict from every code to its row and unit vectors for
+    nearest-airport queries.
+    """
+
+    def __init__(self, table):
+        """
+        :param table:   structured array of airports, see load
+        """
+        self.table = table
+        self.codes = {}
+        # later fields win, so an ICAO code is never shadowed by another airport's ident or IATA code
+        for field in ("ident", "iata", "icao"):
+            for row, code in enumerate(table[field].tolist()):
+                if code:
+                    self.codes[code.decode().upper()] = row
+        lat = np.radians(table["lat"])
+        lon = np.radians(table["lon"])
+        self._vectors = np.column_stack(
+            (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat))
+        )
+        # decoded on the first search, so that loading keeps the table memory-mapped
+        self._names = None
+        self._bboxes = OrderedDict()
+
+    @classmethod
+    def load(cls, path=DEFAULT_DATASET, types=None):
+        """
+        Loads airports from a CSV with the OurAirports columns ident, name, latitude_deg, longitude_deg, iata_code and
+        icao_code (or gps_code). The parsed table is saved as path + ".npy" and memory-mapped instead of re-parsing
+        for as long as it is newer than the CSV.
+        :param path:    (opt.) the CSV file, default the bundled data/airports.csv
+        :param types:   (opt.) only keep airports of these OurAirports types, e.g. ["large_airport"], default None
+                        meaning all
+        :return:        an AirportIndex
+        """
+        cache = f"{path}.npy" if types is None else f"{path}.{'-'.join(types)}.npy"
+        if not (
+            os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path)
+        ):
+            table = _read_csv(path, types)
+            try:
+                np.save(cache, table)
+            except OSError:
+                # read-only dataset directory, keep the parsed table in memory
+                return cls(table)
+        return cls(np.load(cache, mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, code):
+        return code.upper() in self.codes
+
+    def airport(self, row):
+        """
+        :param row: a row of the table
+        :return:    the Airport at row
+        """
+        record = self.table[row]
+        return Airport(
+            record["ident"].decode(),
+            record["icao"].decode(),
+            record["iata"].decode(),
+            record["name"].decode("utf-8", "ignore"),
+            float(record["lat"]),
+            float(record["lon"]),
+        )
+
+    def lookup(self, code):
+        """
+        :param code:    an ICAO, IATA or OurAirports ident code, any case
+        :return:        the Airport, None if no airport has the code
+        """
+        row = self.codes.get(code.upper())
+        return None if row is None else self.airport(row)
+
+    def search(self, name, limit=10):
+        """
+        :param name:    part of an airport's name, any case
+        :param limit:   (opt.) most airports to return, default 10
+        :return:        list of Airports whose name contains name
+        """
+        if self._names is None:
+            self._names = np.char.lower(
+                np.char.decode(self.table["name"], "utf-8", "ignore")
+            )
+        rows = np.flatnonzero(np.char.find(self._names, name.lower()) >= 0)
+        return [self.airport(row) for row in rows[:limit].tolist()]
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Finds the airports closest to a point by great circle distance.
+        :param lat:     latitude in degrees
+        :param lon:     longitude in degrees
+        :param k:       (opt.) number of airports, default 1
+        :return:        list of the k nearest Airports, closest first
+        """
+        lat, lon = np.radians(lat), np.radians(lon)
+        point = np.array(
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+        )
+        # the closest airport has the largest dot product with the point
+        similarity = self._vectors @ point
+        k = min(k, len(similarity))
+        rows = np.argpartition(-similarity, k - 1)[:k]
+        rows = rows[np.argsort(-similarity[rows])]
+        return [self.airport(row) for row in rows.tolist()]
+
+    def bbox(self, code, miles):
+        """
+        Bounding boxes are cached per index, by code and distance, evicting the least recently used one past
+        MAX_BBOXES.
+        :param code:    an ICAO, IATA or ident code
+        :param miles:   distance from the airport to the corners of the box
+        :return:        (lat_min, lon_min, lat_max, lon_max) around the airport, as get_bbox gives
+        :raises:        KeyError if no airport has the code
+        """
+        key = (code.upper(), miles)
+        box = self._bboxes.get(key)
+        if box is not None:
+            self._bboxes.move_to_end(key)
+            return box
+        airport = self.lookup(code)
+        if airport is None:
+            raise KeyError(code)
+        box = tuple(geodesy.bbox(airport.lat, airport.lon, miles).tolist())
+        self._bboxes[key] = box
+        if len(self._bboxes) > MAX_BBOXES:
+            self._bboxes.popitem(last=False)
+        return box
+
+
+def _read_csv(path, types=None):
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            if types is not None and record.get("type") not in types:
+                continue
+            try:
+                lat = float(record["latitude_deg"])
+                lon = float(record["longitude_deg"])
+            except (KeyError, ValueError):
+                continue
+            # DictReader fills the missing fields of short rows with None
+            icao = record.get("icao_code") or record.get("gps_code") or ""
+            rows.append(
+                (
+                    (record.get("ident") or "").encode()[:8],
+                    icao.encode()[:4] if len(icao) == 4 else b"",
+                    (record.get("iata_code") or "").encode()[:3],
+                    (record.get("name") or "").encode("utf-8")[:96],
+                    lat,
+                    lon,
+                )
+            )
+    return np.array(rows, dtype=_DTYPE)
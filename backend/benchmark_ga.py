@@ -0,0 +1,273 @@
+# file:         benchmark_ga.py
+# description:  benchmark and profiling harness for genetic_algorithm. Runs Population over a grid of generation
+#               sizes, chromosome lengths and genome sizes with a cheap batched fitness function and an expensive
+#               per-organism one, reports generations and evaluations per second, peak memory and the time spent in
+#               each phase, and writes the results as JSON so runs can be compared. The default grid takes about
+#               15 s, --full runs the large grid up to 10000 organisms and measures peak memory, which takes minutes.
+#
+#               python benchmark_ga.py --generation-sizes 100 1000 --output run.json
+#               python benchmark_ga.py --full --profile profiles/ --compare run.json
+
+import argparse
+import cProfile
+import itertools
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from genetic_algorithm import Population
+
+PHASES = ("selection", "reproduction", "evaluation", "ranking")
+
+# the grid run by default and the one run with --full, any of them can still be set on the command line
+QUICK = {
+    "generation_sizes": [100, 1000],
+    "chromosome_lens": [10, 50],
+    "genome_sizes": [4, 64],
+    "generations": 10,
+    "memory": False,
+}
+FULL = {
+    "generation_sizes": [100, 1000, 10000],
+    "chromosome_lens": [10, 100],
+    "genome_sizes": [4, 64],
+    "generations": 20,
+    "memory": True,
+}
+
+
+class CheapFitness:
+    """
+    Batched fitness, the share of positions matching a target, a few array operations per generation.
+    """
+
+    def __init__(self, target):
+        self.target = target
+
+    def __call__(self, genes):
+        return (genes == self.target).mean(axis=1)
+
+
+class ExpensiveFitness:
+    """
+    Per-organism fitness walking the chromosome as a route of grid steps and scoring its distance from a set of
+    obstacles, standing in for route scoring against geometry.
+    """
+
+    def __init__(self, obstacles):
+        self.obstacles = obstacles
+
+    def __call__(self, chromosomes):
+        x = y = 0.0
+        clearance = 0.0
+        for gene in chromosomes:
+            angle = gene * 0.1
+            x += np.cos(angle)
+            y += np.sin(angle)
+            clearance += min((x - ox) ** 2 + (y - oy) ** 2 for ox, oy in self.obstacles)
+        return clearance / (1.0 + clearance)
+
+
+def make_population(generation_size, chromosome_len, genome_size, fitness, seed):
+    """
+    :return:    a Population for one benchmark case
+    """
+    rng = np.random.default_rng(seed)
+    genome = list(range(genome_size))
+    if fitness == "cheap":
+        fitness_func = CheapFitness(rng.integers(genome_size, size=chromosome_len))
+        batched = True
+    else:
+        fitness_func = ExpensiveFitness([tuple(p) for p in rng.normal(0, 5, (8, 2))])
+        batched = False
+    return Population(
+        genome,
+        chromosome_len,
+        fitness_func,
+        generation_size=generation_size,
+        batched=batched,
+        seed=seed,
+    )
+
+
+def run_generations(population, generations):
+    """
+    Initializes population and advances it generations times, keeping the time spent in each phase.
+    :return:    dict of the initialization time and the total time of each phase
+    """
+    phases = dict.fromkeys(PHASES, 0.0)
+    start = time.perf_counter()
+    population.initialize_generation()
+    phases["initialization"] = time.perf_counter() - start
+    for _ in range(generations):
+        population.current_generation_index += 1
+        population.advance_one_generation()
+        for phase, seconds in population.timings.items():
+            phases[phase] += seconds
+    return phases
+
+
+def run_case(
+    generation_size,
+    chromosome_len,
+    genome_size,
+    fitness,
+    generations,
+    seed,
+    memory=True,
+    profile_dir=None,
+):
+    """
+    Benchmarks one point of the grid.
+    :return:    dict of throughput, phase timings and peak memory
+    """
+    population = make_population(
+        generation_size, chromosome_len, genome_size, fitness, seed
+    )
+    start = time.perf_counter()
+    phases = run_generations(population, generations)
+    seconds = time.perf_counter() - start
+    evaluations = generation_size * (generations + 1)
+    result = {
+        "generation_size": generation_size,
+        "chromosome_len": chromosome_len,
+        "genome_size": genome_size,
+        "fitness": fitness,
+        "generations": generations,
+        "seed": seed,
+        "seconds": seconds,
+        "generations_per_second": generations / seconds,
+        "evaluations_per_second": evaluations / seconds,
+        "phases": phases,
+        "best_fitness": population.best_fitness,
+    }
+
+    if memory:
+        # a second run under tracemalloc, which slows Python code down too much to time the first
+        population = make_population(
+            generation_size, chromosome_len, genome_size, fitness, seed
+        )
+        tracemalloc.start()
+        run_generations(population, generations)
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    if profile_dir:
+        population = make_population(
+            generation_size, chromosome_len, genome_size, fitness, seed
+        )
+        profiler = cProfile.Profile()
+        profiler.runcall(run_generations, population, generations)
+        path = os.path.join(
+            profile_dir,
+            f"ga_{fitness}_{generation_size}x{chromosome_len}_g{genome_size}.prof",
+        )
+        profiler.dump_stats(path)
+        result["profile"] = path
+    return result
+
+
+def case_key(result):
+    return (
+        result["generation_size"],
+        result["chromosome_len"],
+        result["genome_size"],
+        result["fitness"],
+    )
+
+
+def compare(previous, current):
+    """
+    Prints the change in evaluations per second for every case that appears in both runs
+    """
+    before = {case_key(r): r for r in previous["results"]}
+    for r in current["results"]:
+        old = before.get(case_key(r))
+        if old is None:
+            continue
+        ratio = r["evaluations_per_second"] / old["evaluations_per_second"]
+        print(
+            f"{'x'.join(map(str, case_key(r)))}: {ratio:.2f}x the previous throughput"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark genetic_algorithm")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="run the large grid and measure peak memory, takes minutes",
+    )
+    parser.add_argument("--generation-sizes", type=int, nargs="+")
+    parser.add_argument("--chromosome-lens", type=int, nargs="+")
+    parser.add_argument("--genome-sizes", type=int, nargs="+")
+    parser.add_argument(
+        "--fitness",
+        nargs="+",
+        choices=["cheap", "expensive"],
+        default=["cheap", "expensive"],
+    )
+    parser.add_argument("--generations", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    memory = parser.add_mutually_exclusive_group()
+    memory.add_argument(
+        "--memory", action="store_true", default=None, help="measure peak memory"
+    )
+    memory.add_argument("--no-memory", action="store_false", dest="memory")
+    parser.add_argument(
+        "--profile", help="directory to write a cProfile file per case to"
+    )
+    parser.add_argument("--output", default="benchmark_ga.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    for name, value in (FULL if args.full else QUICK).items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    results = []
+    for fitness, generation_size, chromosome_len, genome_size in itertools.product(
+        args.fitness, args.generation_sizes, args.chromosome_lens, args.genome_sizes
+    ):
+        result = run_case(
+            generation_size,
+            chromosome_len,
+            genome_size,
+            fitness,
+            args.generations,
+            args.seed,
+            memory=args.memory,
+            profile_dir=args.profile,
+        )
+        results.append(result)
+        phases = ", ".join(
+            f"{phase} {seconds * 1000:.1f}ms"
+            for phase, seconds in result["phases"].items()
+        )
+        print(
+            f"{fitness:>9} {generation_size:>6}x{chromosome_len:<4} genome {genome_size:<4}: "
+            f"{result['generations_per_second']:.1f} generations/s, "
+            f"{result['evaluations_per_second']:.0f} evaluations/s ({phases})"
+        )
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), run)
+
+
+if __name__ == "__main__":
+    main()
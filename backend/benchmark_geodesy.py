@@ -0,0 +1,143 @@
+# file:         benchmark_geodesy.py
+# description:  checks geodesy against geopy and measures its throughput. geopy runs on a sample of the points, one
+#               call per point as open_sky used to, and its time is scaled up to the full array. Writes the results
+#               as JSON so runs can be compared.
+#
+#               python benchmark_geodesy.py --size 100000 --output run.json
+
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+import geodesy
+
+EXPECTED = {
+    # metres, geopy uses Karney's algorithm which Vincenty matches away from antipodes
+    "vincenty": 1e-3,
+    "destination": 1e-3,
+    # relative, the sphere against the ellipsoid
+    "haversine": 6e-3,
+}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def make_pairs(size, rng):
+    """
+    :return:    (lat1, lon1, lat2, lon2) of pairs far enough from antipodal for Vincenty to converge
+    """
+    lat1 = rng.uniform(-85, 85, size)
+    lon1 = rng.uniform(-180, 180, size)
+    lat2 = rng.uniform(-85, 85, size)
+    lon2 = lon1 + rng.uniform(-150, 150, size)
+    return lat1, lon1, lat2, (lon2 + 180) % 360 - 180
+
+
+def run(size, sample, seed):
+    rng = np.random.default_rng(seed)
+    lat1, lon1, lat2, lon2 = make_pairs(size, rng)
+    pairs = list(zip(lat1[:sample], lon1[:sample], lat2[:sample], lon2[:sample]))
+    reference, geopy_seconds = timed(
+        lambda: np.array([geodesic((a, b), (c, d)).meters for a, b, c, d in pairs])
+    )
+    geopy_seconds *= size / sample
+    results = {}
+
+    distances, seconds = timed(geodesy.vincenty, lat1, lon1, lat2, lon2)
+    results["vincenty"] = {
+        "seconds": seconds,
+        "speedup": geopy_seconds / seconds,
+        "max_error": float(np.abs(distances[:sample] - reference).max()),
+    }
+
+    distances, seconds = timed(geodesy.haversine, lat1, lon1, lat2, lon2)
+    results["haversine"] = {
+        "seconds": seconds,
+        "speedup": geopy_seconds / seconds,
+        "max_error": float((np.abs(distances[:sample] - reference) / reference).max()),
+    }
+
+    bearing = rng.uniform(0, 360, size)
+    distance = rng.uniform(0, 5e6, size)
+    starts = list(
+        zip(lat1[:sample], lon1[:sample], bearing[:sample], distance[:sample])
+    )
+    points, geopy_seconds = timed(
+        lambda: [geodesic(meters=s).destination((a, b), c) for a, b, c, s in starts]
+    )
+    geopy_seconds *= size / sample
+    (lat, lon), seconds = timed(geodesy.destination, lat1, lon1, bearing, distance)
+    results["destination"] = {
+        "seconds": seconds,
+        "speedup": geopy_seconds / seconds,
+        "max_error": float(
+            geodesy.vincenty(
+                lat[:sample],
+                lon[:sample],
+                [p.latitude for p in points],
+                [p.longitude for p in points],
+            ).max()
+        ),
+    }
+
+    # aircraft within ~100 miles of an airport
+    projection = geodesy.LocalProjection(32.9, -97.04)
+    lat = 32.9 + rng.uniform(-1.5, 1.5, size)
+    lon = -97.04 + rng.uniform(-1.5, 1.5, size)
+    xy, seconds = timed(projection.points, lat, lon)
+    (back_lat, back_lon), inverse_seconds = timed(projection.unproject, xy)
+    half = size // 2
+    planar = np.hypot(*(xy[:half] - xy[half : 2 * half]).T)
+    true = geodesy.vincenty(
+        lat[:half], lon[:half], lat[half : 2 * half], lon[half : 2 * half]
+    )
+    results["projection"] = {
+        "seconds": seconds,
+        "inverse_seconds": inverse_seconds,
+        "round_trip_error": float(geodesy.vincenty(lat, lon, back_lat, back_lon).max()),
+        "distance_error": float((np.abs(planar - true) / true).max()),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark geodesy against geopy")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument(
+        "--sample", type=int, default=2000, help="points to run through geopy"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_geodesy.json")
+    args = parser.parse_args()
+
+    results = run(args.size, min(args.sample, args.size), args.seed)
+    for name, result in results.items():
+        line = ", ".join(f"{key} {value:.3g}" for key, value in result.items())
+        within = ""
+        if name in EXPECTED:
+            ok = result["max_error"] <= EXPECTED[name]
+            within = f" ({'within' if ok else 'OUTSIDE'} tolerance {EXPECTED[name]})"
+        print(f"{name:>11}: {line}{within}")
+
+    run_info = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "size": args.size,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run_info, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
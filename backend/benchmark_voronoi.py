@@ -0,0 +1,422 @@
+"""
+File:   benchmark_voronoi.py
+Description:    benchmark and correctness suite for the voronoi module. Runs
+                bowyer_watson and voronoi_from_triangulation on generated
+                point sets, records wall time, peak memory and triangles per
+                second, checks every triangulation against the empty
+                circumcircle property and Euler's formula, every Voronoi cell
+                against its site and the box area, checks with
+                --workers that the parallel triangulation stitches and matches
+                the serial one, and writes the results as JSON so runs can be
+                compared over time.
+
+                python benchmark_voronoi.py --sizes 10 1000 100000 --output run.json
+                python benchmark_voronoi.py --datasets grid --sizes 40000 --workers 4
+                python benchmark_voronoi.py --compare run.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from parallel_delaunay import MIN_POINTS_PER_WORKER, triangulate_parallel
+from predicates import circumcenter_batch, in_circle_batch, orient
+from voronoi import (
+    TriangleMesh,
+    find_supertriangle,
+    voronoi_from_triangulation,
+    _triangulate,
+)
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def uniform_points(n, rng):
+    return rng.random((n, 2)) * 1000.0
+
+
+def clustered_points(n, rng):
+    centers = rng.random((max(1, n // 500), 2)) * 1000.0
+    return centers[rng.integers(len(centers), size=n)] + rng.normal(0, 5.0, (n, 2))
+
+
+def grid_points(n, rng):
+    side = max(2, math.ceil(math.sqrt(n)))
+    x, y = np.meshgrid(np.arange(side), np.arange(side))
+    return np.column_stack((x.ravel(), y.ravel()))[:n] * 10.0
+
+
+def collinear_points(n, rng):
+    # aircraft parked in a line at the gates, on a 1/1024 grid so that the
+    # points are exactly collinear in floating point
+    t = np.round(np.sort(rng.random(n)) * 1024000.0) / 1024.0
+    return np.column_stack((t, 0.5 * t + 20.0))
+
+
+def taxiway_points(n, rng):
+    # samples along a few runways and the taxiways crossing them, with jitter
+    segments = np.array(
+        [
+            [0, 200, 1000, 200],
+            [0, 800, 1000, 800],
+            [100, 0, 100, 1000],
+            [500, 0, 500, 1000],
+            [900, 0, 900, 1000],
+            [100, 200, 500, 800],
+        ],
+        dtype=np.float64,
+    )
+    chosen = segments[rng.integers(len(segments), size=n)]
+    t = rng.random((n, 1))
+    points = chosen[:, :2] + t * (chosen[:, 2:] - chosen[:, :2])
+    return points + rng.normal(0, 1.0, (n, 2))
+
+
+DATASETS = {
+    "uniform": uniform_points,
+    "clustered": clustered_points,
+    "grid": grid_points,
+    "collinear": collinear_points,
+    "taxiway": taxiway_points,
+}
+
+
+def measure(func, *args, memory=True, **kwargs):
+    """
+    Runs func once untraced for its wall time, then again under tracemalloc
+    for its peak memory, as tracing slows pure Python code down several times
+    Arguments:
+        memory: (opt.) also measure peak memory, default True
+    Returns:
+        its result, the wall time in seconds and the peak traced memory in MB,
+        None if memory is False
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    if not memory:
+        return result, seconds, None
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def check_empty_circumcircles(mesh, points, sample=20000, seed=0):
+    """
+    Delaunay oracle independent of the mesh and its query index: the input
+    points are bucketed in a uniform grid and each triangle's circumcircle is
+    tested against every point in the cells it covers, borderline cases
+    settled with the exact in-circle predicate. Meshes with more triangles
+    than sample are checked on a random sample of them.
+    Arguments:
+        mesh: the TriangleMesh to check
+        points: the points it was built from
+        sample: (opt.) most triangles to check, default 20000
+        seed: (opt.) seed of the sample, default 0
+    Returns:
+        number of checked triangles whose circumcircle holds another point
+    """
+    if len(mesh) == 0:
+        return 0
+    checked = np.arange(len(mesh))
+    if len(mesh) > sample:
+        checked = np.random.default_rng(seed).choice(len(mesh), sample, replace=False)
+    triangles = mesh.triangles[checked]
+    corners = mesh.vertices[triangles]
+    centers = circumcenter_batch(corners[:, 0], corners[:, 1], corners[:, 2])
+    radius = np.sqrt(((centers - corners[:, 0]) ** 2).sum(axis=1)) * (1 + 1e-9)
+
+    coords = np.asarray(points, dtype=np.float64)
+    origin = coords.min(axis=0)
+    size = max((coords.max(axis=0) - origin).max(), 1e-12) / math.sqrt(len(coords))
+    shape = np.floor((coords.max(axis=0) - origin) / size).astype(np.int64) + 1
+    cells = np.floor((coords - origin) / size).astype(np.int64)
+    keys = cells[:, 0] * shape[1] + cells[:, 1]
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    low = np.maximum(np.floor((centers - radius[:, None] - origin) / size), 0)
+    high = np.minimum(np.floor((centers + radius[:, None] - origin) / size), shape - 1)
+
+    pairs = []
+    for t in range(len(triangles)):
+        (x0, y0), (x1, y1) = low[t].astype(np.int64), high[t].astype(np.int64)
+        near = np.concatenate(
+            [
+                order[
+                    np.searchsorted(keys, x * shape[1] + y0) : np.searchsorted(
+                        keys, x * shape[1] + y1, side="right"
+                    )
+                ]
+                for x in range(x0, x1 + 1)
+            ]
+            + [np.empty(0, dtype=np.int64)]
+        )
+        near = near[((coords[near] - centers[t]) ** 2).sum(axis=1) < radius[t] ** 2]
+        pairs.append(np.column_stack((np.full(len(near), t), near)))
+    pairs = np.concatenate(pairs)
+    inside = (
+        in_circle_batch(
+            corners[pairs[:, 0], 0],
+            corners[pairs[:, 0], 1],
+            corners[pairs[:, 0], 2],
+            coords[pairs[:, 1]],
+        )
+        > 0
+    )
+    return len(np.unique(pairs[inside, 0]))
+
+
+def is_collinear(points):
+    """
+    Returns:
+        True if all the points lie exactly on one line
+    """
+    distinct = [tuple(p) for p in np.unique(np.asarray(points), axis=0).tolist()]
+    if len(distinct) < 3:
+        return True
+    first, last = distinct[0], distinct[-1]
+    return all(orient(first, last, p) == 0 for p in distinct)
+
+
+def check_euler(mesh, points):
+    """
+    Euler oracle: a triangulation of m distinct points whose convex hull has
+    h vertices has 2m - h - 2 triangles and 3m - h - 3 edges. Exactly
+    collinear points are the degenerate case and have to give no triangles
+    Returns:
+        dict of the expected and actual counts and whether they match
+    """
+    if is_collinear(points):
+        return {
+            "ok": len(mesh) == 0,
+            "degenerate": "collinear",
+            "triangles": len(mesh),
+            "expected_triangles": 0,
+        }
+    if len(mesh) == 0:
+        return {"ok": False, "triangles": 0}
+    m = len(np.unique(np.asarray(points), axis=0))
+    h = int((mesh.neighbors == -1).sum())
+    edges = (3 * len(mesh) + h) // 2
+    expected_triangles = 2 * m - h - 2
+    expected_edges = 3 * m - h - 3
+    return {
+        "ok": len(mesh) == expected_triangles and edges == expected_edges,
+        "triangles": len(mesh),
+        "expected_triangles": expected_triangles,
+        "edges": edges,
+        "expected_edges": expected_edges,
+    }
+
+
+def check_cells(diagram, mesh, bounds, sample=20000, seed=0):
+    """
+    Voronoi cell oracle: every vertex of a clipped cell has to be at least as
+    close to the cell's site as to any other site, ties allowed up to
+    rounding, and the cells have to tile the box, so their areas sum to its
+    area. Nearest sites come from a greedy walk over the mesh, which is exact
+    on a Delaunay triangulation. Diagrams with more cells than sample are
+    checked on a random sample of them
+    Arguments:
+        diagram: the VoronoiDiagram to check
+        mesh: the TriangleMesh it was built from
+        bounds: min_x, min_y, max_x, max_y of the box the cells are clipped to
+        sample: (opt.) most cells to check the vertices of, default 20000
+        seed: (opt.) seed of the sample, default 0
+    Returns:
+        dict of the number of cells with a vertex closer to another site and
+        the cell and box areas
+    """
+    min_x, min_y, max_x, max_y = bounds
+    box_area = (max_x - min_x) * (max_y - min_y)
+    if len(diagram) == 0:
+        return {"ok": len(mesh) == 0, "misplaced_cells": 0, "area": 0.0}
+    # shoelace over every closed polygon at once, dropping the terms that
+    # would join one polygon's last vertex to the next one's first
+    x, y = diagram.cell_vertices[:, 0], diagram.cell_vertices[:, 1]
+    terms = x[:-1] * y[1:] - x[1:] * y[:-1]
+    joins = diagram.cell_offsets[1:-1] - 1
+    area = (terms.sum() - terms[joins].sum()) / 2
+
+    checked = np.arange(len(diagram))
+    if len(diagram) > sample:
+        checked = np.random.default_rng(seed).choice(
+            len(diagram), sample, replace=False
+        )
+    starts, ends = diagram.cell_offsets[checked], diagram.cell_offsets[checked + 1]
+    owner = np.repeat(np.arange(len(checked)), ends - starts)
+    vertices = diagram.cell_vertices[
+        np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+    ]
+    own = np.sqrt(((vertices - diagram.sites[checked][owner]) ** 2).sum(axis=1))
+    nearest = mesh.vertices[mesh.nearest_site(vertices)]
+    best = np.sqrt(((vertices - nearest) ** 2).sum(axis=1))
+    tolerance = 1e-9 * max(max_x - min_x, max_y - min_y)
+    misplaced = len(np.unique(owner[own > best + tolerance]))
+    return {
+        "ok": bool(misplaced == 0 and abs(area - box_area) <= 1e-9 * box_area),
+        "misplaced_cells": misplaced,
+        "area": float(area),
+        "box_area": float(box_area),
+    }
+
+
+def check_parallel(points, workers):
+    """
+    Parallel oracle: the strips have to stitch without falling back to the
+    serial triangulation, cocircular grids included, and give exactly the
+    serial triangles
+    Returns:
+        True if the parallel path ran and matched, None if there are too few
+        points for it to run
+    """
+    if min(workers, len(points) // MIN_POINTS_PER_WORKER) < 2:
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        try:
+            _, triangles, _ = triangulate_parallel(points, workers)
+        except RuntimeWarning:
+            return False
+    _, serial, _ = _triangulate(points, find_supertriangle(points))
+    serial = np.asarray(serial).reshape(-1, 3)
+    return set(map(tuple, np.sort(triangles, axis=1).tolist())) == set(
+        map(tuple, np.sort(serial, axis=1).tolist())
+    )
+
+
+def run_case(dataset, size, seed, workers=None, check=True, memory=True):
+    """
+    Benchmarks one dataset at one size
+    Returns:
+        dict of timings, memory, throughput and oracle results
+    """
+    rng = np.random.default_rng(seed)
+    points = [tuple(p) for p in DATASETS[dataset](size, rng).tolist()]
+    mesh, tri_seconds, tri_peak = measure(
+        TriangleMesh.from_points, points, workers=workers, memory=memory
+    )
+    min_x, min_y = np.min(points, axis=0) - 1.0
+    max_x, max_y = np.max(points, axis=0) + 1.0
+    diagram, vor_seconds, vor_peak = measure(
+        voronoi_from_triangulation,
+        list(mesh),
+        min_x,
+        min_y,
+        max_x,
+        max_y,
+        output="diagram",
+        memory=memory,
+    )
+    result = {
+        "dataset": dataset,
+        "size": size,
+        "seed": seed,
+        "workers": workers,
+        "triangles": len(mesh),
+        "triangulation_seconds": tri_seconds,
+        "triangulation_peak_mb": tri_peak,
+        "triangles_per_second": len(mesh) / tri_seconds if tri_seconds else None,
+        "voronoi_seconds": vor_seconds,
+        "voronoi_peak_mb": vor_peak,
+        "voronoi_edges": len(diagram.edges),
+        "voronoi_cells": len(diagram),
+        "mesh_mb": mesh.nbytes / 2**20,
+    }
+    if check:
+        result["delaunay_violations"] = check_empty_circumcircles(
+            mesh, points, seed=seed
+        )
+        result["euler"] = check_euler(mesh, points)
+        result["cells"] = check_cells(
+            diagram, mesh, (min_x, min_y, max_x, max_y), seed=seed
+        )
+        if workers:
+            result["parallel_matches_serial"] = check_parallel(points, workers)
+    return result
+
+
+def compare(previous, current):
+    """
+    Prints the change in triangulation and Voronoi time for every case that
+    appears in both runs
+    """
+    before = {(r["dataset"], r["size"]): r for r in previous["results"]}
+    for r in current["results"]:
+        old = before.get((r["dataset"], r["size"]))
+        if old is None:
+            continue
+        print(
+            f"{r['dataset']:>10} {r['size']:>8}: "
+            f"triangulation {r['triangulation_seconds'] / old['triangulation_seconds']:.2f}x, "
+            f"voronoi {r['voronoi_seconds'] / old['voronoi_seconds']:.2f}x of previous"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--datasets", nargs="+", choices=sorted(DATASETS), default=list(DATASETS)
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-check", action="store_true")
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output", default="benchmark_voronoi.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for dataset in args.datasets:
+        for size in args.sizes:
+            result = run_case(
+                dataset,
+                size,
+                args.seed,
+                args.workers,
+                check=not args.no_check,
+                memory=not args.no_memory,
+            )
+            results.append(result)
+            checks = ""
+            if "euler" in result:
+                ok = (
+                    result["euler"]["ok"]
+                    and result["delaunay_violations"] == 0
+                    and result["cells"]["ok"]
+                    and result.get("parallel_matches_serial") is not False
+                )
+                checks = "ok" if ok else "FAILED"
+                if "degenerate" in result["euler"]:
+                    checks += f" ({result['euler']['degenerate']}, no triangles)"
+            print(
+                f"{dataset:>10} {size:>8}: {result['triangulation_seconds']:.3f}s "
+                f"triangulation, {result['voronoi_seconds']:.3f}s voronoi, "
+                f"{result['triangles_per_second'] or 0:.0f} triangles/s {checks}"
+            )
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+File:   dynamic_delaunay.py
+Description:    a Delaunay triangulation of tracked points, e.g. aircraft,
+                that supports inserting, removing and moving single points
+                with local retriangulation, and reports which Voronoi cells
+                changed so only those need to be redrawn
+"""
+
+import math
+
+from predicates import orient, in_circle_perturbed, circumcenter
+from voronoi import (
+    Triangle,
+    find_supertriangle,
+    hilbert_order,
+    _clip_polygon,
+    _insert_point,
+    _link,
+)
+
+_DEAD = [-1, -1, -1]
+# cost of updating one point locally as a share of the cost per point of a
+# rebuild that also finds the changed cells, measured on 1000 to 20000 uniform
+# points: about 1.7, plus 0.1 per mean point spacing it moves for the walk to
+# its new position
+_UPDATE_COST = 1.7
+_WALK_COST = 0.1
+
+
+class DynamicDelaunay:
+    """
+    Delaunay triangulation keyed by point ids. The triangulation keeps the
+    three supertriangle vertices as vertices 0, 1 and 2 so that every tracked
+    point has a closed ring of neighbors, which keeps removal local. Points
+    outside the bounds grow the bounds and trigger a full rebuild.
+    """
+
+    def __init__(self, bounds, points=None):
+        """
+        Arguments:
+            bounds: (min_x, min_y, max_x, max_y) of the area the points are
+                    expected in, Voronoi cells are clipped to it
+            points: (opt.) dict of id -> (x, y) to start with, default None
+        """
+        self.bounds = tuple(bounds)
+        self._rebuild(dict(points or {}))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, point_id):
+        return point_id in self._index
+
+    def position(self, point_id):
+        """
+        Arguments:
+            point_id: the id of a tracked point
+        Returns:
+            the current (x, y) of the point
+        """
+        return self._vertices[self._index[point_id]]
+
+    def insert(self, point_id, point):
+        """
+        Adds a new point to the triangulation
+        Arguments:
+            point_id: the id of the point, must not already be tracked
+            point: (x, y) coordinates of the point
+        Returns:
+            set of ids whose Voronoi cells changed
+        """
+        if point_id in self._index:
+            raise KeyError(f"point {point_id!r} is already tracked")
+        point = tuple(point)
+        if not self._in_bounds(point):
+            return self._grow(point_id, point)
+
+        if self._free_vertices:
+            v = self._free_vertices.pop()
+            self._vertices[v] = point
+            self._ids[v] = point_id
+        else:
+            v = len(self._vertices)
+            self._vertices.append(point)
+            self._ids.append(point_id)
+            self._vertex_triangle.append(-1)
+        self._index[point_id] = v
+        return self._insert_vertex(v)
+
+    def remove(self, point_id):
+        """
+        Removes a point from the triangulation and re-triangulates the hole
+        it leaves
+        Arguments:
+            point_id: the id of a tracked point
+        Returns:
+            set of ids whose Voronoi cells changed, including point_id
+        """
+        v = self._index.pop(point_id)
+        point = self._vertices[v]
+        changed = {point_id}
+        if self._vertex_triangle[v] == -1:
+            # coincident with another point, never part of the triangulation
+            self._hidden[point].remove(v)
+            if not self._hidden[point]:
+                del self._hidden[point]
+        else:
+            changed |= self._remove_vertex(v)
+            # a hidden coincident point takes the place of the removed one
+            for hidden in self._hidden.pop(point, []):
+                changed |= self._insert_vertex(hidden)
+
+        self._vertex_triangle[v] = -1
+        self._ids[v] = None
+        self._free_vertices.append(v)
+        changed.discard(None)
+        return changed
+
+    def move(self, point_id, new_point):
+        """
+        Moves a point, re-triangulating only around its old and new positions
+        Arguments:
+            point_id: the id of a tracked point
+            new_point: new (x, y) coordinates of the point
+        Returns:
+            set of ids whose Voronoi cells changed
+        """
+        new_point = tuple(new_point)
+        if self._vertices[self._index[point_id]] == new_point:
+            return set()
+        changed = self.remove(point_id)
+        changed |= self.insert(point_id, new_point)
+        return {i for i in changed if i in self._index}
+
+    def update(self, points):
+        """
+        Brings the triangulation in line with a new snapshot, e.g. one polling
+        cycle of flight states. Ids missing from the snapshot are removed, new
+        ids are inserted and the rest are moved. When the local updates would
+        cost more than triangulating from scratch, it rebuilds instead
+        Arguments:
+            points: dict of id -> (x, y)
+        Returns:
+            set of ids whose Voronoi cells changed, including removed ids
+        """
+        if self._update_cost(points) > len(points):
+            before = self._neighborhoods()
+            bounds = self.bounds
+            self._rebuild(dict(points))
+            if self.bounds != bounds:
+                # the supertriangle and the clipping changed with the bounds
+                return set(before) | set(self._index)
+            after = self._neighborhoods()
+            return {
+                i for i in before.keys() | after.keys() if before.get(i) != after.get(i)
+            }
+
+        changed = set()
+        for point_id in [i for i in self._index if i not in points]:
+            changed |= self.remove(point_id)
+        for point_id, point in points.items():
+            if point_id in self._index:
+                changed |= self.move(point_id, point)
+            else:
+                changed |= self.insert(point_id, point)
+        return changed
+
+    def _update_cost(self, points):
+        """
+        Estimates the cost of updating to points locally
+        Arguments:
+            points: dict of id -> (x, y)
+        Returns:
+            the estimated cost, in units where a rebuild costs len(points)
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        extent = math.hypot(max_x - min_x, max_y - min_y)
+        area = (max_x - min_x) * (max_y - min_y)
+        spacing = math.sqrt(area / max(len(points), 1)) or 1.0
+        cost = _UPDATE_COST * sum(1 for i in self._index if i not in points)
+        for point_id, point in points.items():
+            if point_id not in self._index:
+                # the walk to a new point starts wherever the last update ended
+                cost += _UPDATE_COST + _WALK_COST * extent / 2 / spacing
+                continue
+            old = self.position(point_id)
+            if old != tuple(point):
+                distance = math.hypot(point[0] - old[0], point[1] - old[1])
+                cost += _UPDATE_COST + _WALK_COST * distance / spacing
+        return cost
+
+    def _neighborhoods(self):
+        """
+        Describes every Voronoi cell by the points it is made of, so that
+        comparing two descriptions tells whether the cell changed
+        Returns:
+            dict of id -> (position, frozenset of the positions of its
+            Delaunay neighbors), an empty set for points hidden by a
+            coincident point
+        """
+        vertices = self._vertices
+        neighbors = [[] for _ in vertices]
+        for a, b, c in self._tri_vertices:
+            if a != -1:
+                neighbors[a] += (b, c)
+                neighbors[b] += (c, a)
+                neighbors[c] += (a, b)
+        return {
+            point_id: (vertices[v], frozenset(vertices[u] for u in neighbors[v]))
+            for point_id, v in self._index.items()
+        }
+
+    def triangulation(self):
+        """
+        Returns:
+            list of Triangles of the current Delaunay triangulation, same as
+            bowyer_watson would return
+        """
+        vertices = self._vertices
+        return [
+            Triangle(vertices[a], vertices[b], vertices[c])
+            for a, b, c in self._tri_vertices
+            if a > 2 and b > 2 and c > 2
+        ]
+
+    def cells(self, point_ids=None):
+        """
+        Finds the Voronoi cells of tracked points, clipped to the bounds
+        Arguments:
+            point_ids: (opt.) ids of the cells to return, e.g. the set
+                       returned by insert, remove or move, default None
+                       meaning every tracked point
+        Returns:
+            dict of id -> closed list of (x, y) polygon vertices, empty list
+            for points hidden by a coincident point
+        """
+        if point_ids is None:
+            point_ids = self._index
+        cells = {}
+        for point_id in point_ids:
+            if point_id not in self._index:
+                continue
+            v = self._index[point_id]
+            if self._vertex_triangle[v] == -1:
+                cells[point_id] = []
+                continue
+            polygon = _clip_polygon(
+                [self._circumcenter(t) for t in self._star(v)[0]], *self.bounds
+            )
+            if polygon:
+                polygon.append(polygon[0])
+            cells[point_id] = polygon
+        return cells
+
+    def _rebuild(self, points):
+        """
+        Triangulates points from scratch inside a supertriangle covering
+        self.bounds
+        Arguments:
+            points: dict of id -> (x, y)
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        points = {i: tuple(p) for i, p in points.items()}
+        for x, y in points.values():
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+        self.bounds = (min_x, min_y, max_x, max_y)
+
+        supertriangle = find_supertriangle([(min_x, min_y), (max_x, max_y)])
+        self._vertices = [supertriangle.p1, supertriangle.p2, supertriangle.p3]
+        if orient(*self._vertices) < 0:
+            self._vertices[1], self._vertices[2] = self._vertices[2], self._vertices[1]
+        self._ids = [None, None, None]
+        self._tri_vertices = [[0, 1, 2]]
+        self._tri_neighbors = [[-1, -1, -1]]
+        self._vertex_triangle = [0, 0, 0]
+        self._free_triangles = []
+        self._free_vertices = []
+        self._hidden = {}
+        self._index = {}
+        self._last = 0
+
+        ids = list(points)
+        self._vertices.extend(points[i] for i in ids)
+        self._ids.extend(ids)
+        self._vertex_triangle.extend(-1 for _ in ids)
+        self._index = {i: v for v, i in enumerate(ids, start=3)}
+        if ids:
+            for k in hilbert_order([points[i] for i in ids]):
+                self._insert_vertex(k + 3)
+
+    def _in_bounds(self, point):
+        min_x, min_y, max_x, max_y = self.bounds
+        return min_x <= point[0] <= max_x and min_y <= point[1] <= max_y
+
+    def _grow(self, point_id, point):
+        """
+        Rebuilds the triangulation with bounds large enough to hold point
+        Returns:
+            set of all tracked ids, every cell may have changed
+        """
+        points = {i: self._vertices[v] for i, v in self._index.items()}
+        points[point_id] = point
+        min_x, min_y, max_x, max_y = self.bounds
+        # leave room so a point drifting further out does not rebuild again
+        margin = max(max_x - min_x, max_y - min_y) * 0.5
+        self.bounds = (
+            min(min_x, point[0] - margin),
+            min(min_y, point[1] - margin),
+            max(max_x, point[0] + margin),
+            max(max_y, point[1] + margin),
+        )
+        self._rebuild(points)
+        return set(self._index)
+
+    def _insert_vertex(self, v):
+        """
+        Inserts vertex v through the Bowyer-Watson cavity step
+        Returns:
+            set of ids whose Voronoi cells changed
+        """
+        new_triangles = _insert_point(
+            self._vertices,
+            self._tri_vertices,
+            self._tri_neighbors,
+            v,
+            self._last,
+            free=self._free_triangles,
+        )
+        if new_triangles is None:
+            self._hidden.setdefault(self._vertices[v], []).append(v)
+            return {self._ids[v]}
+        return self._claim(new_triangles)
+
+    def _remove_vertex(self, v):
+        """
+        Removes vertex v and fills the star-shaped hole around it by clipping
+        Delaunay ears: an ear is kept when it turns counter-clockwise and no
+        other vertex of the hole lies inside its circumcircle
+        Returns:
+            set of ids whose Voronoi cells changed
+        """
+        star, ring = self._star(v)
+        vertices = self._vertices
+        tri_vertices = self._tri_vertices
+        tri_neighbors = self._tri_neighbors
+
+        # the triangle outside each edge of the hole
+        outside = {}
+        for t, a, b in zip(star, ring, ring[1:] + ring[:1]):
+            outside[(a, b)] = tri_neighbors[t][tri_vertices[t].index(v)]
+
+        polygon = list(ring)
+        ears = []
+        while len(polygon) > 3:
+            for i in range(len(polygon)):
+                a, b, c = polygon[i - 1], polygon[i], polygon[(i + 1) % len(polygon)]
+                if orient(vertices[a], vertices[b], vertices[c]) <= 0:
+                    continue
+                if any(
+                    in_circle_perturbed(
+                        vertices[a], vertices[b], vertices[c], vertices[d]
+                    )
+                    > 0
+                    for d in polygon
+                    if d != a and d != b and d != c
+                ):
+                    continue
+                ears.append([a, b, c])
+                del polygon[i]
+                break
+            else:
+                raise RuntimeError(f"no Delaunay ear found removing vertex {v}")
+        ears.append(polygon)
+
+        slots = star[: len(ears)]
+        for t in star[len(ears) :]:
+            tri_vertices[t] = _DEAD
+            tri_neighbors[t] = _DEAD
+            self._free_triangles.append(t)
+
+        edges = {}
+        for t, ear in zip(slots, ears):
+            tri_vertices[t] = ear
+            tri_neighbors[t] = [-1, -1, -1]
+            for i in range(3):
+                edges[(ear[(i + 1) % 3], ear[(i + 2) % 3])] = (t, i)
+        for (a, b), (t, i) in edges.items():
+            if (b, a) in edges:
+                tri_neighbors[t][i] = edges[(b, a)][0]
+            else:
+                other = outside[(a, b)]
+                tri_neighbors[t][i] = other
+                if other != -1:
+                    _link(tri_vertices, tri_neighbors, other, a, b, t)
+        return self._claim(slots)
+
+    def _claim(self, triangles):
+        """
+        Records the new triangles as the walk start and as the incident
+        triangle of their vertices
+        Returns:
+            set of ids of the vertices of the triangles
+        """
+        changed = set()
+        for t in triangles:
+            for u in self._tri_vertices[t]:
+                self._vertex_triangle[u] = t
+                changed.add(self._ids[u])
+        self._last = triangles[-1]
+        changed.discard(None)
+        return changed
+
+    def _star(self, v):
+        """
+        Walks counter-clockwise around vertex v
+        Returns:
+            the triangles incident to v and the ring of vertices around it,
+            both in counter-clockwise order
+        """
+        start = t = self._vertex_triangle[v]
+        star = []
+        ring = []
+        while True:
+            tri = self._tri_vertices[t]
+            i = tri.index(v)
+            star.append(t)
+            ring.append(tri[(i + 1) % 3])
+            t = self._tri_neighbors[t][(i + 1) % 3]
+            if t == start:
+                return star, ring
+
+    def _circumcenter(self, t):
+        return circumcenter(*(self._vertices[u] for u in self._tri_vertices[t]))
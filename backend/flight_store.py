@@ -0,0 +1,278 @@
+# file:         flight_store.py
+# description:  columnar in-memory store of aircraft state history. Rows live in a fixed-size ring buffer of NumPy
+#               columns, so memory is bounded however long the ingest runs, and every row is written twice, at i and
+#               i + capacity, so that any range of rows is one contiguous slice and time-window queries return views
+#               instead of copies. Rows pushed out of the ring can be spilled to .npy files and memory-mapped back
+#               for replay.
+
+import glob
+import os
+
+import numpy as np
+
+# column name -> dtype, aircraft being the id of the row's icao24 in the store
+COLUMNS = {
+    "snapshot": np.float64,
+    "time": np.float64,
+    "lat": np.float64,
+    "lon": np.float64,
+    "altitude": np.float32,
+    "velocity": np.float32,
+    "heading": np.float32,
+    "vertical_rate": np.float32,
+    "on_ground": np.bool_,
+    "aircraft": np.int32,
+}
+
+
+class StateView:
+    """
+    A set of rows of a FlightStateStore or of a spilled block, one NumPy array per column of COLUMNS. Views from
+    FlightStateStore.window share memory with the store and are only valid until the rows are overwritten.
+    """
+
+    __slots__ = tuple(COLUMNS) + ("codes",)
+
+    def __init__(self, columns, codes):
+        """
+        :param columns: dict of column name -> array
+        :param codes:   array of icao24 strings indexed by the aircraft column
+        """
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    @property
+    def icao24(self):
+        """
+        :return:    array of the icao24 code of each row
+        """
+        return self.codes[self.aircraft]
+
+    def take(self, rows):
+        """
+        :param rows:    boolean mask or index array
+        :return:        a StateView of copies of the selected rows
+        """
+        return StateView(
+            {name: getattr(self, name)[rows] for name in COLUMNS}, self.codes
+        )
+
+    def within(self, bbox):
+        """
+        :param bbox:    (lat_min, lon_min, lat_max, lon_max)
+        :return:        a StateView of copies of the rows inside bbox
+        """
+        lat_min, lon_min, lat_max, lon_max = bbox
+        return self.take(
+            (self.lat >= lat_min)
+            & (self.lat <= lat_max)
+            & (self.lon >= lon_min)
+            & (self.lon <= lon_max)
+        )
+
+
+class FlightStateStore:
+    """
+    Ring buffer of state vectors keyed by icao24. Snapshots have to be appended in time order. Once the buffer is
+    full the oldest rows are dropped, or first spilled to spill_dir in blocks of spill_block rows.
+    """
+
+    def __init__(self, capacity=1_000_000, spill_dir=None, spill_block=None):
+        """
+        :param capacity:    (opt.) the most rows held in memory, default 1,000,000 (about 90 MB), a day of polls every
+                            10 s of ~100 aircraft
+        :param spill_dir:   (opt.) directory to write rows to before they leave the buffer, default None meaning
+                            they are dropped
+        :param spill_block: (opt.) the fewest rows spilled at a time, default capacity // 8
+        """
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        self.spill_block = spill_block or max(capacity // 8, 1)
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._columns = {
+            name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in COLUMNS.items()
+        }
+        # rows are numbered from 0 as they are appended, rows start to end - 1 are in the buffer
+        self.start = 0
+        self.end = 0
+        self._ids = {}
+        self._codes = np.empty(0, dtype="U8")
+        self._last_row = np.full(0, -1, dtype=np.int64)
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def codes(self):
+        """
+        :return:    array of every icao24 seen, indexed by aircraft id
+        """
+        if len(self._codes) != len(self._ids):
+            self._codes = np.array(list(self._ids), dtype="U8")
+        return self._codes
+
+    def aircraft_ids(self, icao24):
+        """
+        :param icao24:  array of icao24 codes
+        :return:        int32 array of their aircraft ids, new codes get new ids
+        """
+        ids = self._ids
+        return np.fromiter(
+            (ids.setdefault(code, len(ids)) for code in icao24.tolist()),
+            dtype=np.int32,
+            count=len(icao24),
+        )
+
+    def append(self, batch):
+        """
+        Adds a snapshot of state vectors.
+        :param batch:   an ingest.StateBatch
+        :return:        None
+        :raises:        ValueError if the snapshot is older than the newest one in the store
+        """
+        n = len(batch)
+        if n == 0:
+            return
+        if (
+            len(self)
+            and batch.snapshot_time
+            < self._columns["snapshot"][self._slot(self.end - 1)]
+        ):
+            raise ValueError("snapshots have to be appended in time order")
+        if n > self.capacity:
+            batch = batch.take(slice(n - self.capacity, n))
+            n = self.capacity
+
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self._evict(max(overflow, self.spill_block) if self.spill_dir else overflow)
+
+        aircraft = self.aircraft_ids(batch.icao24)
+        values = {
+            "snapshot": batch.snapshot_time,
+            "time": batch.time,
+            "lat": batch.lat,
+            "lon": batch.lon,
+            "altitude": batch.altitude,
+            "velocity": batch.velocity,
+            "heading": batch.heading,
+            "vertical_rate": batch.vertical_rate,
+            "on_ground": batch.on_ground,
+            "aircraft": aircraft,
+        }
+        slots = self._slot(np.arange(self.end, self.end + n))
+        for name, column in self._columns.items():
+            column[slots] = values[name]
+            column[slots + self.capacity] = values[name]
+
+        if len(self._last_row) < len(self._ids):
+            grown = np.full(max(len(self._ids), 2 * len(self._last_row)), -1, np.int64)
+            grown[: len(self._last_row)] = self._last_row
+            self._last_row = grown
+        self._last_row[aircraft] = np.arange(self.end, self.end + n)
+        self.end += n
+
+    def _slot(self, row):
+        return row % self.capacity
+
+    def _view(self, first, last):
+        """
+        :return:    StateView of rows first to last - 1, slices of the mirrored columns
+        """
+        begin = self._slot(first)
+        return StateView(
+            {
+                name: column[begin : begin + last - first]
+                for name, column in self._columns.items()
+            },
+            self.codes,
+        )
+
+    def _evict(self, count):
+        count = min(count, len(self))
+        if self.spill_dir:
+            view = self._view(self.start, self.start + count)
+            block = np.empty(
+                count, dtype=[(name, dtype) for name, dtype in COLUMNS.items()]
+            )
+            for name in COLUMNS:
+                block[name] = getattr(view, name)
+            np.save(
+                os.path.join(self.spill_dir, f"states_{self.start:012d}.npy"), block
+            )
+            np.save(os.path.join(self.spill_dir, "aircraft.npy"), self.codes)
+        self.start += count
+
+    def all(self):
+        """
+        :return:    StateView of every row in the buffer, oldest first, without copying
+        """
+        return self._view(self.start, self.end)
+
+    def window(self, start_time, end_time):
+        """
+        :param start_time:  earliest snapshot time in epoch seconds, inclusive
+        :param end_time:    latest snapshot time in epoch seconds, inclusive
+        :return:            StateView of the rows of the snapshots in the window, without copying
+        """
+        snapshots = self.all().snapshot
+        first = int(np.searchsorted(snapshots, start_time, side="left"))
+        last = int(np.searchsorted(snapshots, end_time, side="right"))
+        return self._view(self.start + first, self.start + max(first, last))
+
+    def query(self, start_time, end_time, bbox):
+        """
+        :param start_time:  earliest snapshot time in epoch seconds, inclusive
+        :param end_time:    latest snapshot time in epoch seconds, inclusive
+        :param bbox:        (lat_min, lon_min, lat_max, lon_max)
+        :return:            StateView of copies of the rows in the window inside bbox
+        """
+        return self.window(start_time, end_time).within(bbox)
+
+    def latest(self, bbox=None):
+        """
+        :param bbox:    (opt.) only aircraft whose latest position is inside (lat_min, lon_min, lat_max, lon_max),
+                        default None
+        :return:        StateView with the latest row of every aircraft still in the buffer
+        """
+        rows = self._last_row[self._last_row >= self.start]
+        slots = self._slot(np.sort(rows))
+        latest = StateView(
+            {name: column[slots] for name, column in self._columns.items()}, self.codes
+        )
+        return latest if bbox is None else latest.within(bbox)
+
+    def track(self, icao24):
+        """
+        :param icao24:  an aircraft's icao24 code
+        :return:        StateView of copies of the aircraft's rows in the buffer, oldest first
+        """
+        everything = self.all()
+        aircraft = self._ids.get(icao24)
+        if aircraft is None:
+            return everything.take(slice(0, 0))
+        return everything.take(everything.aircraft == aircraft)
+
+    def spilled(self):
+        """
+        :return:    sorted list of the spilled block files
+        """
+        if not self.spill_dir:
+            return []
+        return sorted(glob.glob(os.path.join(self.spill_dir, "states_*.npy")))
+
+
+def load_spilled(path):
+    """
+    Memory-maps a block spilled by a FlightStateStore.
+    :param path:    a states_*.npy file
+    :return:        StateView whose columns are views into the file
+    """
+    block = np.load(path, mmap_mode="r")
+    codes = np.load(os.path.join(os.path.dirname(path), "aircraft.npy"))
+    return StateView({name: block[name] for name in COLUMNS}, codes)
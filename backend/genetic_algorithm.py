@@ -1,9 +1,166 @@
 # file:         genetic_algorithm.py
 # description:  contains the classes and structure for a generic GA
 
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
 import numpy as np
 
-from tqdm import tqdm
+from selection import SELECTIONS
+
+# the fitness function of a process pool worker, set once when the worker starts
+_worker_fitness_func = None
+
+
+def _init_worker(batch_fitness_func):
+    global _worker_fitness_func
+    _worker_fitness_func = batch_fitness_func
+
+
+def _evaluate_in_worker(genes):
+    return _worker_fitness_func(genes)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when the time budget of an evolve run passes in the middle of scoring a generation.
+    """
+
+
+def gene_array(genome):
+    """
+    :param genome:  a list of all valid genetic bases
+    :return:        the genome as a 1-D NumPy array, of objects if the bases do not fit a plain dtype (e.g. tuples)
+    """
+    genes = np.asarray(genome)
+    if genes.ndim != 1:
+        genes = np.empty(len(genome), dtype=object)
+        for i, gene in enumerate(genome):
+            genes[i] = gene
+    return genes
+
+
+class BatchedFitness:
+    """
+    Adapter that turns a per-organism fitness function into a batched one, for Populations given a fitness function
+    that scores one list of bases at a time.
+    """
+
+    def __init__(self, fitness_func):
+        """
+        :param fitness_func:    function taking one organism's chromosomes as a list of bases, returning its fitness
+        """
+        self.fitness_func = fitness_func
+
+    def __call__(self, genes):
+        """
+        :param genes:   generation_size x chromosome_len array of bases, one organism per row
+        :return:        vector of the fitness of each row
+        """
+        return np.array(
+            [self.fitness_func(row) for row in genes.tolist()], dtype=np.float64
+        )
+
+
+class OrganismFitness:
+    """
+    Adapter that scores a single organism with a batched fitness function, so that Organisms keep a per-organism
+    fitness_func whichever kind the Population was given.
+    """
+
+    def __init__(self, batch_fitness_func):
+        """
+        :param batch_fitness_func:  function taking an array of bases with one organism per row, returning a vector
+                                    of their fitness
+        """
+        self.batch_fitness_func = batch_fitness_func
+
+    def __call__(self, chromosomes):
+        """
+        :param chromosomes: one organism's chromosomes as a list of bases
+        :return:            its fitness
+        """
+        return float(self.batch_fitness_func(gene_array(chromosomes)[None])[0])
+
+
+class FitnessCache:
+    """
+    Least recently used cache of fitness values, keyed by a hash of the bytes of a chromosome's genome indices.
+    Holds at most max_size entries, evicting the least recently used one when full.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param max_size:    the maximum number of fitness values to keep
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values = OrderedDict()
+
+    def __len__(self):
+        return len(self._values)
+
+    @staticmethod
+    def keys(chromosomes):
+        """
+        :param chromosomes: matrix of genome indices, one organism per row
+        :return:            list of the hash of each row
+        """
+        rows = np.ascontiguousarray(chromosomes)
+        return [
+            hashlib.blake2b(row, digest_size=16).digest()
+            for row in rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize)))
+        ]
+
+    def get(self, key):
+        """
+        :param key: the hash of a chromosome
+        :return:    its cached fitness, None on a miss
+        """
+        fitness = self._values.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._values.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        """
+        :param key:     the hash of a chromosome
+        :param fitness: its fitness
+        :return:        None
+        """
+        self._values[key] = fitness
+        self._values.move_to_end(key)
+        if len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        :return:    dict of hits, misses, evictions, hit rate and current size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._values),
+        }
 
 
 class Organism:
@@ -12,45 +169,43 @@ class Organism:
     for selecting the next generation.
     """
 
-    def __init__(self, chromosomes, fitness_func, genome, to_string=None):
+    def __init__(self, chromosomes, fitness_func, genome, to_string=None, fitness=None):
         """
         :param chromosomes:     a list of tokens that can be considered this organism's "gene sequence"
         :param fitness_func:    the function used to evaluate how "fit" this organism is
         :param genome:          a list of all valid genetic bases
+        :param to_string:       (opt.) function to use as this organism's __str__(), default None
+        :param fitness:         (opt.) the already known fitness of chromosomes, default None meaning it is evaluated
         """
         self.chromosomes = chromosomes
         self.fitness_func = fitness_func
         self.genome = genome
         self.to_string = to_string
 
-        self.fitness = self.fitness_func(self.chromosomes)
+        self.fitness = (
+            self.fitness_func(self.chromosomes) if fitness is None else fitness
+        )
 
-    def reproduce(self, other, crossover=0.80):
+    def reproduce(self, other, crossover=0.80, rng=None):
         """
         Creates a new organism using the chromosomes of each parent, with a chance of mutation equal to
         1-crossover.
         :param other:       the other organism for genes to passed on
         :param crossover:   the chance of a gene to be taken from a parent
+        :param rng:         (opt.) the numpy Generator to draw from, default None meaning a fresh one
         :return:            a new organism inheriting traits from both parents
         """
-        child_chromosome = []
-        rng = np.random.default_rng()
-
-        for gene1, gene2 in zip(self.chromosomes, other.chromosomes):
-            p = rng.random()
-
-            if p < crossover / 2:
-                child_chromosome.append(gene1)
-                continue
-
-            elif p < crossover:
-                child_chromosome.append(gene2)
-                continue
+        if rng is None:
+            rng = np.random.default_rng()
+        genes = gene_array(self.genome)
 
-            child_chromosome.append(np.random.choice(self.genome))
+        p = rng.random(len(self.chromosomes))
+        child = genes[rng.integers(len(genes), size=len(p))]
+        child[p < crossover] = gene_array(other.chromosomes)[p < crossover]
+        child[p < crossover / 2] = gene_array(self.chromosomes)[p < crossover / 2]
 
         return Organism(
-            child_chromosome, self.fitness_func, self.genome, to_string=self.to_string
+            child.tolist(), self.fitness_func, self.genome, to_string=self.to_string
         )
 
     def __str__(self):
@@ -66,6 +221,11 @@ class Population:
     """
     Represents a group of individuals, on which to simulate evolution on. Uses the roulette wheel method for
     creating the next generation.
+
+    A generation is held as a matrix, each row being an organism's chromosomes as indices into the genome, with a
+    matching vector of fitness values, so that selection, crossover and mutation act on the whole generation at
+    once. The generation is kept unsorted, the fittest organisms are found with a partial sort when needed and the
+    best organism ever seen is tracked as it changes. Organism objects are only built when one is asked for.
     """
 
     def __init__(
@@ -78,12 +238,27 @@ class Population:
         threshold=0.999,
         patience=0,
         organism_to_string=None,
+        crossover=0.80,
+        seed=None,
+        batched=False,
+        executor=None,
+        workers=None,
+        chunk_size=64,
+        cache_size=0,
+        selection="roulette",
+        elitism=0,
+        callbacks=None,
+        verbose=False,
+        checkpoint_path=None,
+        checkpoint_interval=10,
     ):
         """
         :param genome:              a list of all valid genetic bases
         :param chromosome_len:      the length of the target chromosome
         :param fitness_func:        the function used to evaluate how "fit" this organism is, the greater the fitness
-                                    the better
+                                    the better. Takes an organism's chromosomes as a list of bases, or with batched
+                                    the whole generation as a generation_size x chromosome_len array of bases, returning
+                                    a vector with one fitness per row
         :param generation_size:     (opt.) number of organisms per generation, default 500
         :param num_generations:     (opt.) the maximum number of generations, beyond initialization, default 200
         :param threshold:           (opt.) if the fitness is beyond this threshold for an organism, stop evolution,
@@ -94,128 +269,547 @@ class Population:
                                     turned off
         :param organism_to_string:  (opt.) function that should be used by the Organism object as its __str__() method,
                                     default None
+        :param crossover:           (opt.) the chance of a gene to be taken from a parent rather than mutated,
+                                    default .80
+        :param seed:                (opt.) seed for the random number generator, the same seed gives the same run,
+                                    default None
+        :param batched:             (opt.) fitness_func scores a whole generation per call, default False
+        :param executor:            (opt.) evaluate fitness in parallel, "process" or "thread" for a pool owned by
+                                    this Population or an existing concurrent.futures Executor, default None meaning
+                                    everything is evaluated in this thread. A process pool needs a picklable
+                                    fitness_func, which is sent to each worker once when it starts
+        :param workers:             (opt.) number of workers of an owned pool, default None meaning one per core
+        :param chunk_size:          (opt.) number of organisms per parallel task, default 64
+        :param cache_size:          (opt.) remember the fitness of up to this many distinct chromosomes so repeats are
+                                    not scored again, assumes fitness_func always gives the same chromosomes the same
+                                    fitness, default 0 meaning no cache
+        :param selection:           (opt.) how parents are picked, "roulette", "sus", "tournament", "rank" or a
+                                    function select(fitness, count, rng) returning count indices, default "roulette"
+        :param elitism:             (opt.) number of the fittest organisms carried over to the next generation
+                                    unchanged, default 0
+        :param callbacks:           (opt.) functions called as callback(population, metrics) after every generation,
+                                    metrics being the dict from Population.metrics(), default None
+        :param verbose:             (opt.) print the fittest organism every generation and why evolution stopped,
+                                    default False
+        :param checkpoint_path:     (opt.) file fully_evolve_population saves a checkpoint to, default None meaning no
+                                    checkpoints
+        :param checkpoint_interval: (opt.) number of generations between checkpoints, default 10
         """
         self.genome = genome
         self.chromosome_len = chromosome_len
         self.generation_size = generation_size
-        self.fitness_func = fitness_func
+        if batched:
+            self.batch_fitness_func = fitness_func
+            self.fitness_func = OrganismFitness(fitness_func)
+        else:
+            self.batch_fitness_func = BatchedFitness(fitness_func)
+            self.fitness_func = fitness_func
         self.num_generations = num_generations
         self.threshold = threshold
         self.patience = patience
         self.organism_to_string = organism_to_string
-
+        self.crossover = crossover
+        self.rng = np.random.default_rng(seed)
+        self.executor = executor
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._owns_pool = False
+        self.cache = FitnessCache(cache_size) if cache_size > 0 else None
+        self.select = SELECTIONS[selection] if isinstance(selection, str) else selection
+        self.elitism = elitism
+        self.callbacks = list(callbacks or [])
+        self.verbose = verbose
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+
+        self.genes = gene_array(genome)
         self.current_generation_index = 0
-        self.current_generation = []
+        # generation_size x chromosome_len matrix of indices into genes, in no particular order
+        self.chromosomes = np.empty((0, chromosome_len), dtype=np.int32)
+        self.fitness = np.empty(0, dtype=np.float64)
+        # the fittest chromosomes ever seen, and the generations since their fitness last improved
+        self.best_chromosomes = None
+        self.best_fitness = -np.inf
+        self.patience_counter = 0
+        self.timings = {}
+        # anytime evolution state, see evolve
+        self.deadline = None
+        self.stop_reason = None
+
+    @property
+    def current_generation(self):
+        """
+        :return:    the current generation as a list of Organisms, sorted by fitness
+        """
+        return [self.organism(i) for i in self.top(len(self.fitness))]
+
+    @property
+    def best(self):
+        """
+        :return:    the fittest Organism ever seen by this Population, None before the first generation
+        """
+        if self.best_chromosomes is None:
+            return None
+        return self._organism(self.best_chromosomes, self.best_fitness)
+
+    def organism(self, index):
+        """
+        :param index:   the row of the organism in the current generation
+        :return:        the Organism at index
+        """
+        return self._organism(self.chromosomes[index], self.fitness[index])
+
+    def fittest(self):
+        """
+        :return:    the fittest Organism of the current generation
+        """
+        return self.organism(int(np.argmax(self.fitness)))
+
+    def _organism(self, chromosomes, fitness):
+        return Organism(
+            self.genes[chromosomes].tolist(),
+            self.fitness_func,
+            self.genome,
+            to_string=self.organism_to_string,
+            fitness=float(fitness),
+        )
 
-    def fully_evolve_population(self):
+    def top(self, count):
+        """
+        Finds the fittest organisms with a partial sort, O(generation_size + count log count).
+        :param count:   number of organisms
+        :return:        the rows of the count fittest organisms of the current generation, fittest first
+        """
+        count = min(count, len(self.fitness))
+        if count == 0:
+            return np.empty(0, dtype=np.intp)
+        if count < len(self.fitness):
+            rows = np.argpartition(-self.fitness, count - 1)[:count]
+        else:
+            rows = np.arange(count)
+        return rows[np.argsort(-self.fitness[rows], kind="stable")]
+
+    def fully_evolve_population(self, time_budget=None):
         """
         Given the current generation, evolve the population until either the threshold is hit or the maximum number
-        of generations is hit.
-        :return:    the most fit organism from evolving this papulation.
+        of generations is hit. A Population restored with load_checkpoint carries on where it stopped.
+        :param time_budget: (opt.) also stop after this many seconds, default None meaning no time limit
+        :return:            the most fit organism from evolving this papulation.
         """
-        self.initialize_generation()  # this is considered generation 0
-        fittest_organism = self.current_generation[0]
+        for _ in self.evolve(time_budget):
+            pass
+        return self.best
 
-        prev_fittest_organism = self.current_generation[0]
-        patience_counter = 0
+    def evolve_until(self, time_budget):
+        """
+        Anytime evolution, evolving until the time budget runs out unless another stopping condition comes first.
+        The budget is checked between generations and between chunks of fitness evaluations, so the overrun is at
+        most one chunk's evaluation.
+        :param time_budget: the wall clock budget in seconds
+        :return:            the best organism found, None if the first generation could not be scored in time, and
+                            why evolution stopped: "threshold", "patience", "max_generations" or "deadline"
+        """
+        for _ in self.evolve(time_budget):
+            pass
+        return self.best, self.stop_reason
+
+    def evolve(self, time_budget=None):
+        """
+        Evolves the population like fully_evolve_population, as a generator so callers can act on a good enough
+        organism early. When the generator finishes, self.best is the best organism found and self.stop_reason says
+        why evolution stopped: "threshold", "patience", "max_generations" or "deadline".
+        :param time_budget: (opt.) stop after this many seconds, default None meaning no time limit
+        :return:            generator yielding an Organism each time the best fitness so far improves, starting with
+                            the fittest of generation 0
+        """
+        self.deadline = None if time_budget is None else time.monotonic() + time_budget
+        self.stop_reason = "deadline"
+        try:
+            if not len(self.fitness):
+                try:
+                    self.initialize_generation()  # this is considered generation 0
+                except DeadlineExceeded:
+                    return
+                self.patience_counter = 0
+            yield self.best
 
-        if self.num_generations == 0:
             while True:
-                self.current_generation_index += 1
-                fittest_organism = self.advance_one_generation()
-                print(f"fittest organism: {fittest_organism}")
+                if (
+                    self.num_generations
+                    and self.current_generation_index >= self.num_generations
+                ):
+                    self.stop_reason = "max_generations"
+                    return
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    self.stop_reason = "deadline"
+                    return
 
-                if fittest_organism == prev_fittest_organism:
-                    patience_counter += 1
+                self.current_generation_index += 1
+                best_fitness = self.best_fitness
+                try:
+                    fittest_organism = self.advance_one_generation()
+                except DeadlineExceeded:
+                    self.current_generation_index -= 1
+                    self.stop_reason = "deadline"
+                    return
+                self.log("fittest organism:", fittest_organism)
+                if self.best_fitness > best_fitness:
+                    self.patience_counter = 0
+                    yield self.best
                 else:
-                    patience_counter = 0
-                    prev_fittest_organism = fittest_organism
+                    self.patience_counter += 1
+
+                if (
+                    self.checkpoint_path
+                    and self.current_generation_index % self.checkpoint_interval == 0
+                ):
+                    self.save_checkpoint(self.checkpoint_path)
 
-                if patience_counter >= self.patience != 0:
-                    print(
+                if self.patience_counter >= self.patience != 0:
+                    self.log(
                         f"fitness has not improved in {self.patience} iterations, stopping early..."
                     )
-                    return fittest_organism
+                    self.stop_reason = "patience"
+                    return
 
-                if fittest_organism.fitness >= self.threshold:
-                    print(f"fitness >= threshold {self.threshold}, stopping...")
-                    return fittest_organism
+                if self.best_fitness >= self.threshold:
+                    self.log(f"fitness >= threshold {self.threshold}, stopping...")
+                    self.stop_reason = "threshold"
+                    return
+        finally:
+            self.deadline = None
 
-        for _ in range(self.num_generations):
-            self.current_generation_index += 1
-            fittest_organism = self.advance_one_generation()
-            print(f"fittest organism: {fittest_organism}")
+    async def evolve_async(self, time_budget=None):
+        """
+        Async iterator version of evolve, running the generations in a worker thread so the event loop stays free.
+        :param time_budget: (opt.) stop after this many seconds, default None meaning no time limit
+        :return:            async iterator yielding an Organism each time the best fitness so far improves
+        """
+        generator = self.evolve(time_budget)
+        done = object()
+        while True:
+            organism = await asyncio.to_thread(next, generator, done)
+            if organism is done:
+                return
+            yield organism
 
-            if fittest_organism == prev_fittest_organism:
-                patience_counter += 1
-            else:
-                patience_counter = 0
-                prev_fittest_organism = fittest_organism
+    def advance_one_generation(self):
+        """
+        Advances the population by one generation, drawing all parents at once with the selection strategy. Changes
+        the state of this Population object. Reports the generation's metrics to the callbacks.
+        :return:    the fittest Organism from this generation
+        """
+        start = time.perf_counter()
+        elites = min(self.elitism, len(self.fitness))
+        count = self.generation_size - elites
+        parents = self.select(self.fitness, 2 * count, self.rng).reshape(count, 2)
+        selected = time.perf_counter()
+        children = self.reproduce(parents[:, 0], parents[:, 1])
+        reproduced = time.perf_counter()
+        fitness = self.evaluate(children)
+        evaluated = time.perf_counter()
+        if elites:
+            rows = self.top(elites)
+            children = np.concatenate((self.chromosomes[rows], children))
+            fitness = np.concatenate((self.fitness[rows], fitness))
+        self.set_generation(children, fitness)
+        self.timings = {
+            "selection": selected - start,
+            "reproduction": reproduced - selected,
+            "evaluation": evaluated - reproduced,
+            "ranking": time.perf_counter() - evaluated,
+        }
+
+        if self.callbacks:
+            metrics = self.metrics()
+            for callback in self.callbacks:
+                callback(self, metrics)
+        return self.fittest()
+
+    def metrics(self):
+        """
+        :return:    dict of the current generation's index, best and mean fitness, the best fitness ever seen, diversity, the time each phase of
+                    the last advance_one_generation took and the fitness cache statistics
+        """
+        return {
+            "generation": self.current_generation_index,
+            "best": float(self.fitness.max()),
+            "best_ever": float(self.best_fitness),
+            "mean": float(self.fitness.mean()),
+            "diversity": self.diversity(),
+            "timings": dict(self.timings),
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    def diversity(self):
+        """
+        :return:    the average over all positions of the share of organisms not carrying that position's most common
+                    base, 0 when every organism is the same
+        """
+        n, length = self.chromosomes.shape
+        if n == 0:
+            return 0.0
+        # count every (position, base) pair in one bincount
+        pairs = np.arange(length) * len(self.genes) + self.chromosomes
+        counts = np.bincount(pairs.ravel(), minlength=length * len(self.genes))
+        most_common = counts.reshape(length, len(self.genes)).max(axis=1)
+        return float(1 - most_common.mean() / n)
+
+    def log(self, *message):
+        """
+        Prints message, converting it to text only if this Population is verbose.
+        :param message: the objects to print
+        :return:        None
+        """
+        if self.verbose:
+            print(*message)
 
-            if patience_counter >= self.patience != 0:
-                print(
-                    f"fitness has not improved in {self.patience} iterations, stopping early..."
+    def save_checkpoint(self, path):
+        """
+        Writes the current generation, the random number generator state and the early stopping state to path, so
+        that load_checkpoint can resume exactly where this run is. The file is replaced atomically. The fitness cache
+        is not saved.
+        :param path:    the file to write, NumPy .npz format
+        :return:        None
+        """
+        best_chromosomes = self.best_chromosomes
+        if best_chromosomes is None:
+            # np.savez would store None as an object array that np.load refuses without allow_pickle
+            best_chromosomes = np.empty(
+                (0, self.chromosome_len), dtype=self.chromosomes.dtype
+            )
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                chromosomes=self.chromosomes,
+                fitness=self.fitness,
+                generation=self.current_generation_index,
+                best_chromosomes=best_chromosomes,
+                best_fitness=self.best_fitness,
+                patience_counter=self.patience_counter,
+                rng_state=json.dumps(self.rng.bit_generator.state),
+            )
+        os.replace(temp_path, path)
+
+    def load_checkpoint(self, path):
+        """
+        Restores the state written by save_checkpoint. The Population should be built with the same arguments as
+        the one that saved it.
+        :param path:    the file written by save_checkpoint
+        :return:        None
+        :raises:        ValueError if the checkpoint's chromosomes do not match this Population's chromosome_len
+        """
+        with np.load(path) as checkpoint:
+            if checkpoint["chromosomes"].shape[1] != self.chromosome_len:
+                raise ValueError(
+                    f"checkpoint has chromosomes of length {checkpoint['chromosomes'].shape[1]}, "
+                    f"expected {self.chromosome_len}"
                 )
-                break
-
-            if fittest_organism.fitness >= self.threshold:
-                print(f"fitness >= threshold {self.threshold}, stopping...")
-                return fittest_organism
+            self.chromosomes = checkpoint["chromosomes"]
+            self.fitness = checkpoint["fitness"]
+            self.current_generation_index = int(checkpoint["generation"])
+            # a missing or empty best_chromosomes means there is no best organism yet
+            best_chromosomes = checkpoint.get("best_chromosomes", np.empty(0))
+            self.best_chromosomes = best_chromosomes if best_chromosomes.size else None
+            self.best_fitness = float(checkpoint["best_fitness"])
+            self.patience_counter = int(checkpoint["patience_counter"])
+            self.rng.bit_generator.state = json.loads(str(checkpoint["rng_state"]))
+
+    def reproduce(self, first, second):
+        """
+        Creates one child per pair of parents, each gene coming from the first parent with a chance of crossover / 2,
+        from the second with a chance of crossover / 2 and mutated to a random base otherwise.
+        :param first:   array of the first parent's index in the current generation, one per child
+        :param second:  array of the second parent's index in the current generation, one per child
+        :return:        the children's chromosomes as a matrix of genome indices
+        """
+        shape = (len(first), self.chromosome_len)
+        p = self.rng.random(shape)
+        children = self.rng.integers(len(self.genes), size=shape, dtype=np.int32)
+        children = np.where(p < self.crossover, self.chromosomes[second], children)
+        return np.where(p < self.crossover / 2, self.chromosomes[first], children)
 
-        return fittest_organism
+    def evaluate(self, chromosomes):
+        """
+        Scores chromosomes, looking each one up in the cache first if there is one. Only the distinct chromosomes
+        that miss are sent to the fitness function.
+        :param chromosomes: matrix of genome indices, one organism per row
+        :return:            vector of the fitness of each row
+        :raises:            ValueError if the fitness function does not return one value per row
+        """
+        if self.cache is None:
+            return self.score(chromosomes)
+
+        keys = self.cache.keys(chromosomes)
+        fitness = np.empty(len(keys), dtype=np.float64)
+        missing = {}  # key -> rows with that chromosome
+        for i, key in enumerate(keys):
+            if key in missing:
+                # a repeat of a chromosome already being scored
+                missing[key].append(i)
+                self.cache.hits += 1
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = [i]
+            else:
+                fitness[i] = cached
+        if missing:
+            rows = [group[0] for group in missing.values()]
+            scores = self.score(chromosomes[rows])
+            for (key, group), score in zip(missing.items(), scores.tolist()):
+                fitness[group] = score
+                self.cache.put(key, score)
+        return fitness
+
+    def score(self, chromosomes):
+        """
+        Runs the fitness function on chromosomes, in parallel chunks if there is an executor.
+        :param chromosomes: matrix of genome indices, one organism per row
+        :return:            vector of the fitness of each row
+        :raises:            ValueError if the fitness function does not return one value per row, DeadlineExceeded if
+                            the deadline of the running evolve passes before every chunk is scored
+        """
+        genes = self.genes[chromosomes]
+        chunks = [
+            genes[i : i + self.chunk_size]
+            for i in range(0, len(genes), self.chunk_size)
+        ]
+        if self.executor is None and self.deadline is None or len(chunks) <= 1:
+            fitness = self.batch_fitness_func(genes)
+        elif self.executor is None:
+            fitness = []
+            for chunk in chunks:
+                if time.monotonic() >= self.deadline:
+                    raise DeadlineExceeded()
+                fitness.append(
+                    np.asarray(self.batch_fitness_func(chunk), dtype=np.float64)
+                )
+            fitness = np.concatenate(fitness)
+        else:
+            # chunks come back in order, so the result does not depend on the number of workers
+            pool, task = self.pool()
+            futures = [pool.submit(task, chunk) for chunk in chunks]
+            timeout = None
+            if self.deadline is not None:
+                timeout = max(self.deadline - time.monotonic(), 0)
+            _, not_done = wait(futures, timeout=timeout)
+            if not_done:
+                for future in not_done:
+                    future.cancel()
+                raise DeadlineExceeded()
+            fitness = np.concatenate(
+                [np.asarray(f.result(), dtype=np.float64) for f in futures]
+            )
+        fitness = np.asarray(fitness, dtype=np.float64)
+        if fitness.shape != (len(chromosomes),):
+            raise ValueError(
+                f"fitness_func returned shape {fitness.shape} for {len(chromosomes)} organisms"
+            )
+        return fitness
+
+    def pool(self):
+        """
+        Starts the executor's pool on first use.
+        :return:    the Executor and the function it should map over chunks of bases
+        :raises:    ValueError if executor is not "process", "thread" or an Executor
+        """
+        if self._pool is None:
+            if isinstance(self.executor, Executor):
+                self._pool = self.executor
+            elif self.executor == "process":
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.batch_fitness_func,),
+                )
+                self._owns_pool = True
+            elif self.executor == "thread":
+                self._pool = ThreadPoolExecutor(self.workers)
+                self._owns_pool = True
+            else:
+                raise ValueError(
+                    f'executor must be "process", "thread" or an Executor, not {self.executor!r}'
+                )
+        if self._owns_pool and self.executor == "process":
+            return self._pool, _evaluate_in_worker
+        return self._pool, self.batch_fitness_func
 
-    def advance_one_generation(self):
+    def close(self):
         """
-        Advances the population by one generation using the roulette wheel method. Changes the state of this
-        Population object. Assumes that the current generation is already sorted by fitness.
-        :return:    the fittest Organism from this generation
+        Shuts down the pool this Population started, an Executor passed in is left to its owner.
+        :return:    None
         """
-        new_generation = []
-        rng = np.random.default_rng()
+        if self._owns_pool:
+            self._pool.shutdown()
+        self._pool = None
+        self._owns_pool = False
 
-        total_fitness = sum([o.fitness for o in self.current_generation])
-        probs = [o.fitness / total_fitness for o in self.current_generation]
+    def __enter__(self):
+        return self
 
-        for _ in tqdm(
-            range(self.generation_size),
-            desc=f"Generation {self.current_generation_index}",
-        ):
-            p1 = self.current_generation[rng.choice(self.generation_size, p=probs)]
-            p2 = self.current_generation[rng.choice(self.generation_size, p=probs)]
-            child = p1.reproduce(p2)
-            new_generation.append(child)
+    def __exit__(self, *exc_info):
+        self.close()
 
-        self.current_generation = sorted(
-            new_generation, key=lambda o: o.fitness, reverse=True
-        )  # sort the new generation by fitness
-        return self.current_generation[0]
+    def set_generation(self, chromosomes, fitness):
+        """
+        Replaces the current generation, updating the best organism ever seen if the generation beats it.
+        :param chromosomes: matrix of genome indices, one organism per row
+        :param fitness:     vector of the fitness of each row
+        :return:            None
+        """
+        self.chromosomes = chromosomes
+        self.fitness = fitness
+        if len(fitness):
+            row = int(np.argmax(fitness))
+            if fitness[row] > self.best_fitness:
+                self.best_fitness = float(fitness[row])
+                self.best_chromosomes = chromosomes[row].copy()
+
+    def immigrate(self, chromosomes, fitness):
+        """
+        Replaces the least fit organisms of the current generation with organisms from elsewhere, e.g. another
+        island.
+        :param chromosomes: matrix of genome indices of the incoming organisms, one per row
+        :param fitness:     vector of their fitness
+        :return:            None
+        """
+        count = min(len(fitness), len(self.fitness))
+        if count == 0:
+            return
+        keep = self.top(len(self.fitness) - count)
+        self.set_generation(
+            np.concatenate((self.chromosomes[keep], chromosomes[:count])),
+            np.concatenate((self.fitness[keep], fitness[:count])),
+        )
 
     def initialize_generation(self):
         """
-        Updates self.current_generation if it's currently empty with self.generation_size number of organisms.
+        Updates the current generation if it's currently empty with self.generation_size number of organisms.
         :return:    None
         """
-        if self.current_generation:
+        if len(self.fitness):
             return
 
-        for _ in range(self.generation_size):
-            organism = self.create_random_organism()
-            self.current_generation.append(organism)
+        chromosomes = self.random_chromosomes(self.generation_size)
+        self.set_generation(chromosomes, self.evaluate(chromosomes))
 
-        self.current_generation = sorted(
-            self.current_generation, key=lambda o: o.fitness, reverse=True
+    def random_chromosomes(self, count):
+        """
+        :param count:   number of organisms
+        :return:        matrix of count random rows of genome indices
+        """
+        return self.rng.integers(
+            len(self.genes), size=(count, self.chromosome_len), dtype=np.int32
         )
 
     def create_random_organism(self):
         """
         :return:    An Organism with a random set of chromosomes.
         """
-        chromosomes = []
-        rng = np.random.default_rng()
-
-        for i in range(self.chromosome_len):
-            chromosomes.append(rng.choice(self.genome))
-
+        chromosomes = self.genes[self.random_chromosomes(1)[0]].tolist()
         return Organism(
             chromosomes,
             self.fitness_func,
@@ -0,0 +1,326 @@
+# file:         geodesy.py
+# description:  vectorized geodesy on the WGS-84 ellipsoid for arrays of points: haversine and Vincenty distance,
+#               Vincenty destination point, bounding boxes and a local east-north-up tangent plane projection that
+#               turns lat/lon into the planar x/y voronoi expects. Every function takes scalars or NumPy arrays of
+#               degrees and broadcasts them against each other.
+#
+#               Vincenty distances and destinations agree with geopy.distance.geodesic to within a millimetre, except
+#               for nearly antipodal points, where the inverse iteration does not converge and the haversine
+#               distance is used instead. Haversine is on a sphere of the mean earth radius and is up to 0.6% off.
+#               The projection round trip is exact to within a millimetre, and projected distances are within 0.1% of
+#               geodesic ones up to ~100 miles from the origin. benchmark_geodesy.py checks these against geopy.
+
+import numpy as np
+
+# WGS-84
+A = 6378137.0
+F = 1 / 298.257223563
+B = A * (1 - F)
+E2 = F * (2 - F)
+EARTH_RADIUS = 6371008.8
+MILE = 1609.344
+
+
+def haversine(lat1, lon1, lat2, lon2, radius=EARTH_RADIUS):
+    """
+    Great circle distance on a sphere
+    :param lat1:    latitude of the first points in degrees
+    :param lon1:    longitude of the first points in degrees
+    :param lat2:    latitude of the second points in degrees
+    :param lon2:    longitude of the second points in degrees
+    :param radius:  (opt.) radius of the sphere in metres, default the mean earth radius
+    :return:        distance in metres
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    h = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * radius * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _series(cos2_alpha):
+    u2 = cos2_alpha * (A**2 - B**2) / B**2
+    big_a = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    big_b = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    return big_a, big_b
+
+
+def _delta_sigma(big_b, sin_sigma, cos_sigma, cos_2sigma_m):
+    return (
+        big_b
+        * sin_sigma
+        * (
+            cos_2sigma_m
+            + big_b
+            / 4
+            * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m**2)
+                - big_b
+                / 6
+                * cos_2sigma_m
+                * (-3 + 4 * sin_sigma**2)
+                * (-3 + 4 * cos_2sigma_m**2)
+            )
+        )
+    )
+
+
+def _inverse_step(lam, big_l, sin_u1, cos_u1, sin_u2, cos_u2):
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+    cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+    sigma = np.arctan2(sin_sigma, cos_sigma)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # coincident points have sin_sigma 0
+        sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+        cos2_alpha = 1 - sin_alpha**2
+        # equatorial lines have cos2_alpha 0
+        cos_2sigma_m = np.where(
+            cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha
+        )
+    c = F / 16 * cos2_alpha * (4 + F * (4 - 3 * cos2_alpha))
+    lam = big_l + (1 - c) * F * sin_alpha * (
+        sigma
+        + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m**2))
+    )
+    return sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma_m, lam
+
+
+def vincenty(lat1, lon1, lat2, lon2, tol=1e-12, max_iter=200):
+    """
+    Ellipsoidal distance with Vincenty's inverse formula. Each iteration only updates the pairs that have not
+    converged yet, so a few slow ones do not hold the whole array up.
+    :param lat1:        latitude of the first points in degrees
+    :param lon1:        longitude of the first points in degrees
+    :param lat2:        latitude of the second points in degrees
+    :param lon2:        longitude of the second points in degrees
+    :param tol:         (opt.) convergence threshold on lambda in radians, default 1e-12 (~0.006 mm)
+    :param max_iter:    (opt.) most iterations, default 200
+    :return:            distance in metres
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (lat1, lon1, lat2, lon2))
+    )
+    shape = lat1.shape
+    big_l = np.radians(lon2 - lon1).ravel()
+    u1 = np.arctan((1 - F) * np.tan(np.radians(lat1))).ravel()
+    u2 = np.arctan((1 - F) * np.tan(np.radians(lat2))).ravel()
+    fixed = (big_l, np.sin(u1), np.cos(u1), np.sin(u2), np.cos(u2))
+
+    lam = big_l.copy()
+    state = [np.empty_like(lam) for _ in range(5)]
+    active = np.arange(len(lam))
+    for _ in range(max_iter):
+        *values, new_lam = _inverse_step(lam[active], *(v[active] for v in fixed))
+        for array, value in zip(state, values):
+            array[active] = value
+        done = np.abs(new_lam - lam[active]) < tol
+        lam[active] = new_lam
+        active = active[~done]
+        if not len(active):
+            break
+    sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma_m = state
+
+    big_a, big_b = _series(cos2_alpha)
+    distance = (
+        B * big_a * (sigma - _delta_sigma(big_b, sin_sigma, cos_sigma, cos_2sigma_m))
+    )
+    if len(active):
+        # nearly antipodal points, fall back to the sphere
+        distance[active] = haversine(
+            lat1.ravel()[active],
+            lon1.ravel()[active],
+            lat2.ravel()[active],
+            lon2.ravel()[active],
+        )
+    return distance.reshape(shape)
+
+
+def destination(lat, lon, bearing, distance, tol=1e-12, max_iter=200):
+    """
+    Point reached by travelling along a geodesic, with Vincenty's direct formula
+    :param lat:         latitude of the start points in degrees
+    :param lon:         longitude of the start points in degrees
+    :param bearing:     initial bearing in degrees clockwise from north
+    :param distance:    distance in metres
+    :param tol:         (opt.) convergence threshold on sigma in radians, default 1e-12
+    :param max_iter:    (opt.) most iterations, default 200
+    :return:            (latitude, longitude) of the destinations in degrees
+    """
+    lat, lon, bearing, distance = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (lat, lon, bearing, distance))
+    )
+    alpha1 = np.radians(bearing)
+    sin_alpha1, cos_alpha1 = np.sin(alpha1), np.cos(alpha1)
+    u1 = np.arctan((1 - F) * np.tan(np.radians(lat)))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sigma1 = np.arctan2(np.tan(u1), cos_alpha1)
+    sin_alpha = cos_u1 * sin_alpha1
+    cos2_alpha = 1 - sin_alpha**2
+    big_a, big_b = _series(cos2_alpha)
+
+    sigma = distance / (B * big_a)
+    for _ in range(max_iter):
+        cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+        sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+        previous = sigma
+        sigma = distance / (B * big_a) + _delta_sigma(
+            big_b, sin_sigma, cos_sigma, cos_2sigma_m
+        )
+        if (np.abs(sigma - previous) < tol).all():
+            break
+    cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+
+    tmp = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+    lat2 = np.arctan2(
+        sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1,
+        (1 - F) * np.hypot(sin_alpha, tmp),
+    )
+    lam = np.arctan2(
+        sin_sigma * sin_alpha1, cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1
+    )
+    c = F / 16 * cos2_alpha * (4 + F * (4 - 3 * cos2_alpha))
+    big_l = lam - (1 - c) * F * sin_alpha * (
+        sigma
+        + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m**2))
+    )
+    lon2 = (lon + np.degrees(big_l) + 180) % 360 - 180
+    return np.degrees(lat2), lon2
+
+
+def bbox(lat, lon, miles):
+    """
+    Boxes with the given distance from the centre to the south west and north east corners, as open_sky.get_bbox
+    :param lat:     latitude of the centres in degrees
+    :param lon:     longitude of the centres in degrees
+    :param miles:   distance from the centre to the corners in miles
+    :return:        array of (lat_min, lon_min, lat_max, lon_max) with one row per centre
+    """
+    lat, lon, miles = np.broadcast_arrays(lat, lon, miles)
+    corners = destination(
+        lat[..., None], lon[..., None], np.array([225.0, 45.0]), miles[..., None] * MILE
+    )
+    sw_lat, ne_lat = corners[0][..., 0], corners[0][..., 1]
+    sw_lon, ne_lon = corners[1][..., 0], corners[1][..., 1]
+    return np.stack((sw_lat, sw_lon, ne_lat, ne_lon), axis=-1)
+
+
+def to_ecef(lat, lon, alt=0.0):
+    """
+    :param lat: latitude in degrees
+    :param lon: longitude in degrees
+    :param alt: (opt.) height above the ellipsoid in metres, default 0
+    :return:    earth centred earth fixed (x, y, z) in metres
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    sin_lat = np.sin(lat)
+    n = A / np.sqrt(1 - E2 * sin_lat**2)
+    return (
+        (n + alt) * np.cos(lat) * np.cos(lon),
+        (n + alt) * np.cos(lat) * np.sin(lon),
+        (n * (1 - E2) + alt) * sin_lat,
+    )
+
+
+def from_ecef(x, y, z):
+    """
+    Bowring's closed form, sub-millimetre near the earth's surface
+    :param x:   earth centred earth fixed x in metres
+    :param y:   earth centred earth fixed y in metres
+    :param z:   earth centred earth fixed z in metres
+    :return:    (latitude, longitude, height) in degrees and metres
+    """
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * A, p * B)
+    lat = np.arctan2(
+        z + E2 / (1 - E2) * B * np.sin(theta) ** 3, p - E2 * A * np.cos(theta) ** 3
+    )
+    sin_lat = np.sin(lat)
+    alt = p * np.cos(lat) + z * sin_lat - A * np.sqrt(1 - E2 * sin_lat**2)
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), alt
+
+
+class LocalProjection:
+    """
+    East-north-up tangent plane at an origin. Distances and angles in the plane are close to true ones near the
+    origin, so projected aircraft positions can be triangulated by voronoi as ordinary x/y points in metres.
+    """
+
+    def __init__(self, lat, lon, alt=0.0):
+        """
+        :param lat: latitude of the origin in degrees
+        :param lon: longitude of the origin in degrees
+        :param alt: (opt.) height of the origin in metres, default 0
+        """
+        self.lat, self.lon, self.alt = float(lat), float(lon), float(alt)
+        self.origin = np.array(to_ecef(self.lat, self.lon, self.alt))
+        phi, lam = np.radians(self.lat), np.radians(self.lon)
+        # rows are the east, north and up unit vectors in ECEF
+        self.rotation = np.array(
+            [
+                [-np.sin(lam), np.cos(lam), 0.0],
+                [-np.sin(phi) * np.cos(lam), -np.sin(phi) * np.sin(lam), np.cos(phi)],
+                [np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)],
+            ]
+        )
+
+    @classmethod
+    def centered(cls, lat, lon):
+        """
+        :param lat: latitudes in degrees
+        :param lon: longitudes in degrees
+        :return:    a LocalProjection with its origin in the middle of the points' extent
+        """
+        lat, lon = np.asarray(lat), np.asarray(lon)
+        # the middle of the shortest arc holding every longitude, not the middle of -180..180
+        lon_mid = np.degrees(
+            np.arctan2(np.sin(np.radians(lon)).mean(), np.cos(np.radians(lon)).mean())
+        )
+        return cls((lat.min() + lat.max()) / 2, lon_mid)
+
+    def forward(self, lat, lon, alt=0.0):
+        """
+        :param lat: latitude in degrees
+        :param lon: longitude in degrees
+        :param alt: (opt.) height in metres, default 0
+        :return:    (east, north, up) in metres from the origin
+        """
+        ecef = np.stack(np.broadcast_arrays(*to_ecef(lat, lon, alt)), axis=-1)
+        enu = (ecef - self.origin) @ self.rotation.T
+        return enu[..., 0], enu[..., 1], enu[..., 2]
+
+    def inverse(self, east, north, up=0.0):
+        """
+        :param east:    metres east of the origin
+        :param north:   metres north of the origin
+        :param up:      (opt.) metres above the tangent plane, default 0
+        :return:        (latitude, longitude, height) in degrees and metres
+        """
+        enu = np.stack(np.broadcast_arrays(east, north, up), axis=-1)
+        ecef = enu @ self.rotation + self.origin
+        return from_ecef(ecef[..., 0], ecef[..., 1], ecef[..., 2])
+
+    def points(self, lat, lon):
+        """
+        :param lat: latitudes in degrees
+        :param lon: longitudes in degrees
+        :return:    (n, 2) array of east, north coordinates of the points on the ellipsoid's surface,
+                    to pass to voronoi.bowyer_watson
+        """
+        east, north, _ = self.forward(lat, lon)
+        return np.column_stack((np.ravel(east), np.ravel(north)))
+
+    def unproject(self, points):
+        """
+        :param points:  (n, 2) array of east, north coordinates, e.g. Voronoi vertices
+        :return:        (latitude, longitude) arrays of the points on the ellipsoid's surface
+        """
+        points = np.asarray(points, dtype=np.float64)
+        # the surface drops away from the plane, so look for the height of the surface under each point
+        up = 0.0
+        for _ in range(3):
+            lat, lon, _ = self.inverse(points[:, 0], points[:, 1], up)
+            up = self.forward(lat, lon)[2]
+        return lat, lon
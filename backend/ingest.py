@@ -0,0 +1,366 @@
+# file:         ingest.py
+# description:  asyncio pipeline polling OpenSky state vectors for a few airport bounding boxes, with request
+#               coalescing, backoff and skipping of unchanged snapshots, plus a replay source that plays recorded
+#               snapshots back from disk faster than real time. Bounding boxes use the get_bbox layout:
+#               (lat_min, lon_min, lat_max, lon_max).
+
+import asyncio
+import glob
+import os
+import random
+import time
+
+import numpy as np
+
+# state vector fields kept from OpenSky, with the names pyopensky and the raw API give them
+_COLUMNS = {
+    "icao24": ("icao24",),
+    "callsign": ("callsign",),
+    "time": ("last_position", "time_position", "timestamp"),
+    "lat": ("latitude", "lat"),
+    "lon": ("longitude", "lon"),
+    "altitude": ("altitude", "baroaltitude", "baro_altitude", "geoaltitude"),
+    "velocity": ("groundspeed", "velocity"),
+    "heading": ("track", "true_track", "heading"),
+    "vertical_rate": ("vertical_rate", "vertrate"),
+    "on_ground": ("onground", "on_ground"),
+}
+
+
+class StateBatch:
+    """
+    One snapshot of aircraft state vectors as NumPy columns: icao24 and callsign strings, time (epoch seconds of the
+    last position), lat, lon, altitude (m), velocity (m/s), heading (deg), vertical_rate (m/s) and on_ground.
+    snapshot_time is the time of the whole snapshot in epoch seconds.
+    """
+
+    __slots__ = ("snapshot_time",) + tuple(_COLUMNS)
+
+    def __init__(self, snapshot_time, **columns):
+        self.snapshot_time = float(snapshot_time)
+        n = len(columns.get("icao24", ()))
+        for field in _COLUMNS:
+            if field in ("icao24", "callsign"):
+                default = np.full(n, "", dtype="U8")
+                setattr(self, field, np.asarray(columns.get(field, default), dtype=str))
+            elif field == "on_ground":
+                setattr(
+                    self,
+                    field,
+                    np.asarray(columns.get(field, np.zeros(n, dtype=bool)), dtype=bool),
+                )
+            else:
+                setattr(
+                    self,
+                    field,
+                    np.asarray(
+                        columns.get(field, np.full(n, np.nan)), dtype=np.float64
+                    ),
+                )
+
+    @classmethod
+    def from_frame(cls, frame, snapshot_time=None):
+        """
+        Normalizes the DataFrame pyopensky returns for REST().states()
+        :param frame:           DataFrame of state vectors
+        :param snapshot_time:   (opt.) time of the snapshot in epoch seconds, default None meaning the latest
+                                position time in the frame
+        :return:                a StateBatch, rows without a position are dropped
+        """
+        columns = {}
+        for field, names in _COLUMNS.items():
+            name = next((name for name in names if name in frame.columns), None)
+            if name is not None:
+                columns[field] = _normalize(field, frame[name])
+
+        batch = cls(0.0, **columns)
+        batch = batch.take(np.isfinite(batch.lat) & np.isfinite(batch.lon))
+        if snapshot_time is None:
+            times = batch.time[np.isfinite(batch.time)]
+            snapshot_time = times.max() if len(times) else time.time()
+        batch.snapshot_time = float(snapshot_time)
+        return batch
+
+    def __len__(self):
+        return len(self.icao24)
+
+    def take(self, rows):
+        """
+        :param rows:    boolean mask or index array
+        :return:        a StateBatch of the selected rows
+        """
+        return StateBatch(
+            self.snapshot_time,
+            **{field: getattr(self, field)[rows] for field in _COLUMNS},
+        )
+
+    def within(self, bbox):
+        """
+        :param bbox:    (lat_min, lon_min, lat_max, lon_max)
+        :return:        a StateBatch of the aircraft inside bbox
+        """
+        lat_min, lon_min, lat_max, lon_max = bbox
+        return self.take(
+            (self.lat >= lat_min)
+            & (self.lat <= lat_max)
+            & (self.lon >= lon_min)
+            & (self.lon <= lon_max)
+        )
+
+    def save(self, path):
+        """
+        Records the batch for ReplaySource
+        :param path:    the .npz file to write
+        :return:        None
+        """
+        np.savez(
+            path,
+            snapshot_time=self.snapshot_time,
+            **{field: getattr(self, field) for field in _COLUMNS},
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path:    a file written by save
+        :return:        the StateBatch it holds
+        """
+        with np.load(path) as data:
+            return cls(
+                float(data["snapshot_time"]),
+                **{field: data[field] for field in _COLUMNS if field in data},
+            )
+
+
+def _normalize(field, series):
+    """
+    Converts a state vector column to a NumPy array. pyopensky columns may be pyarrow backed, where missing values
+    are pd.NA, which cannot be compared or converted to bool, so nulls are filled before anything else.
+    :param field:   the StateBatch field the column is for
+    :param series:  the pandas Series
+    :return:        str array for icao24 and callsign, bool for on_ground, float64 otherwise with nan for nulls and
+                    times in epoch seconds
+    """
+    import pandas as pd
+
+    if field in ("icao24", "callsign"):
+        return series.fillna("").astype(str).str.strip().to_numpy(dtype=str)
+    if field == "on_ground":
+        return series.fillna(False).astype(bool).to_numpy(dtype=bool)
+    if field == "time" and not pd.api.types.is_numeric_dtype(series):
+        # datetimes, timezone aware or not, or timestamp strings
+        times = pd.to_datetime(series, utc=True).astype("datetime64[ns, UTC]")
+        series = (times - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def union(boxes):
+    """
+    :param boxes:   list of (lat_min, lon_min, lat_max, lon_max)
+    :return:        the smallest bbox holding all of them
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return (*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist())
+
+
+def area(bbox):
+    return max(bbox[2] - bbox[0], 0) * max(bbox[3] - bbox[1], 0)
+
+
+def coalesce(boxes):
+    """
+    Groups bounding boxes so overlapping or nearby ones share a single fetch: two groups merge while their union
+    covers no more area than the two fetched separately.
+    :param boxes:   dict of name -> bbox
+    :return:        list of (bbox to fetch, names of the boxes it serves)
+    """
+    groups = [(tuple(bbox), [name]) for name, bbox in boxes.items()]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(groups)):
+            for j in range(i + 1, len(groups)):
+                both = union([groups[i][0], groups[j][0]])
+                if area(both) <= area(groups[i][0]) + area(groups[j][0]):
+                    groups[i] = (both, groups[i][1] + groups[j][1])
+                    del groups[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return groups
+
+
+class OpenSkySource:
+    """
+    Live state vectors from the OpenSky REST API through pyopensky, fetched in a worker thread. Identical requests
+    in flight at the same time share one API call.
+    """
+
+    exhausted = False
+
+    def __init__(self, rest=None):
+        """
+        :param rest:    (opt.) a pyopensky REST client, default None meaning an anonymous one
+        """
+        if rest is None:
+            from pyopensky.rest import REST
+
+            rest = REST()
+        self.rest = rest
+        self._in_flight = {}
+
+    async def fetch(self, bbox):
+        """
+        :param bbox:    (lat_min, lon_min, lat_max, lon_max)
+        :return:        StateBatch of the aircraft inside bbox
+        """
+        bbox = tuple(bbox)
+        task = self._in_flight.get(bbox)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(bbox))
+            self._in_flight[bbox] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(bbox, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, bbox):
+        lat_min, lon_min, lat_max, lon_max = bbox
+        # pyopensky takes bounds as west, south, east, north
+        frame = await asyncio.to_thread(
+            self.rest.states, bounds=(lon_min, lat_min, lon_max, lat_max)
+        )
+        if frame is None:
+            return StateBatch(time.time())
+        return StateBatch.from_frame(frame)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    def now(self):
+        return time.time()
+
+
+class ReplaySource:
+    """
+    Plays snapshots recorded with StateBatch.save, or raw state vector frames saved as CSV, back in time order on a
+    virtual clock, so the pipeline can run offline. The clock advances by whatever the pipeline sleeps, but real time
+    passes speed times faster.
+    """
+
+    def __init__(self, paths, speed=None):
+        """
+        :param paths:   a directory of .npz or .csv snapshots, a glob pattern or a list of files
+        :param speed:   (opt.) how many times faster than real time to play, default None meaning without waiting
+        """
+        if isinstance(paths, str):
+            if os.path.isdir(paths):
+                paths = glob.glob(os.path.join(paths, "*.npz")) + glob.glob(
+                    os.path.join(paths, "*.csv")
+                )
+            else:
+                paths = glob.glob(paths)
+        self.snapshots = sorted(
+            (_load_snapshot(path) for path in paths), key=lambda b: b.snapshot_time
+        )
+        if not self.snapshots:
+            raise ValueError("no snapshots to replay")
+        self.times = np.array([b.snapshot_time for b in self.snapshots])
+        self.speed = speed
+        self.clock = self.times[0]
+
+    @property
+    def exhausted(self):
+        return self.clock > self.times[-1]
+
+    async def fetch(self, bbox):
+        """
+        :param bbox:    (lat_min, lon_min, lat_max, lon_max)
+        :return:        the latest snapshot at the virtual clock, cut to bbox
+        """
+        index = max(int(np.searchsorted(self.times, self.clock, side="right")) - 1, 0)
+        return self.snapshots[index].within(bbox)
+
+    async def sleep(self, seconds):
+        self.clock += seconds
+        await asyncio.sleep(seconds / self.speed if self.speed else 0)
+
+    def now(self):
+        return self.clock
+
+
+def _load_snapshot(path):
+    if not path.endswith(".csv"):
+        return StateBatch.load(path)
+    import pandas as pd
+
+    # read with the pyarrow backed, nullable dtypes pyopensky frames have
+    return StateBatch.from_frame(pd.read_csv(path, dtype_backend="pyarrow"))
+
+
+class Ingest:
+    """
+    Polls a source for the state vectors around a set of airports every interval seconds and streams normalized
+    batches per airport. Airports whose boxes overlap are fetched together, snapshots that have not changed since
+    the last poll are skipped, and failed polls back off exponentially with jitter.
+    """
+
+    def __init__(self, source, boxes, interval=10.0, max_backoff=300.0, seed=None):
+        """
+        :param source:      OpenSkySource, ReplaySource or any object with async fetch(bbox), async sleep(seconds),
+                            now() and exhausted
+        :param boxes:       dict of airport name -> (lat_min, lon_min, lat_max, lon_max)
+        :param interval:    (opt.) seconds between polls, default 10 which is OpenSky's anonymous time resolution
+        :param max_backoff: (opt.) longest wait after repeated failures in seconds, default 300
+        :param seed:        (opt.) seed for the backoff jitter, default None
+        """
+        self.source = source
+        self.boxes = dict(boxes)
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.groups = coalesce(self.boxes)
+        self.stats = {"polls": 0, "fetches": 0, "errors": 0, "unchanged": 0}
+        self._random = random.Random(seed)
+        self._last_snapshot = {}
+        self._failures = 0
+
+    async def stream(self, max_polls=None):
+        """
+        :param max_polls:   (opt.) stop after this many polls, default None meaning until the source is exhausted
+        :return:            async iterator of (airport name, StateBatch)
+        """
+        polls = 0
+        while not self.source.exhausted and (max_polls is None or polls < max_polls):
+            polls += 1
+            self.stats["polls"] += 1
+            started = self.source.now()
+            results = await asyncio.gather(
+                *(self.source.fetch(bbox) for bbox, _ in self.groups),
+                return_exceptions=True,
+            )
+            self.stats["fetches"] += len(results)
+
+            failed = False
+            for (bbox, names), batch in zip(self.groups, results):
+                if isinstance(batch, Exception):
+                    failed = True
+                    self.stats["errors"] += 1
+                    continue
+                if batch.snapshot_time <= self._last_snapshot.get(bbox, -np.inf):
+                    self.stats["unchanged"] += 1
+                    continue
+                self._last_snapshot[bbox] = batch.snapshot_time
+                for name in names:
+                    yield name, (
+                        batch if len(names) == 1 else batch.within(self.boxes[name])
+                    )
+
+            self._failures = self._failures + 1 if failed else 0
+            await self.source.sleep(
+                max(self._delay() - (self.source.now() - started), 0)
+            )
+
+    def _delay(self):
+        if not self._failures:
+            return self.interval
+        backoff = min(self.interval * 2**self._failures, self.max_backoff)
+        return backoff * (0.5 + self._random.random() / 2)
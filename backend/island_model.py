@@ -0,0 +1,306 @@
+# file:         island_model.py
+# description:  runs several GA Populations ("islands") side by side in separate processes, migrating the fittest
+#               organisms between them every few generations
+
+import multiprocessing
+
+import numpy as np
+
+from genetic_algorithm import Organism, Population
+
+
+def ring(islands, rng):
+    """
+    :return:    for each island the islands it receives migrants from, here the island before it
+    """
+    return [[(i - 1) % islands] for i in range(islands)]
+
+
+def fully_connected(islands, rng):
+    """
+    :return:    for each island the islands it receives migrants from, here every other island
+    """
+    return [[j for j in range(islands) if j != i] for i in range(islands)]
+
+
+def random_pairs(islands, rng):
+    """
+    :return:    for each island the islands it receives migrants from, here one other island picked at random
+    """
+    order = rng.permutation(islands)
+    sources = [None] * islands
+    for k, i in enumerate(order):
+        sources[i] = [int(order[k - 1])]
+    return sources
+
+
+TOPOLOGIES = {
+    "ring": ring,
+    "fully_connected": fully_connected,
+    "random": random_pairs,
+}
+
+
+def _evolve(population, generations, immigrants, migration_size):
+    """
+    Takes in migrants, runs an island for some generations and picks its emigrants.
+    :return:    the island's fittest migration_size chromosomes and their fitness, and its best chromosomes so far and
+                their fitness
+    """
+    if immigrants is not None:
+        population.immigrate(*immigrants)
+    for _ in range(generations):
+        population.current_generation_index += 1
+        population.advance_one_generation()
+    return _emigrants(population, migration_size)
+
+
+def _emigrants(population, migration_size):
+    """
+    :return:    copies of the chromosomes and fitness of the island's fittest migration_size organisms, fittest first,
+                and of the best chromosomes the island has seen and their fitness
+    """
+    rows = population.top(migration_size)
+    return (
+        population.chromosomes[rows],
+        population.fitness[rows],
+        population.best_chromosomes.copy(),
+        population.best_fitness,
+    )
+
+
+def _island_worker(conn, population_kwargs, seed, migration_size):
+    """
+    Main loop of an island's process, evolving its Population for each (generations, immigrants) request it
+    receives until it receives None.
+    """
+    with Population(seed=seed, **population_kwargs) as population:
+        population.initialize_generation()
+        conn.send(_emigrants(population, migration_size))
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            generations, immigrants = request
+            conn.send(_evolve(population, generations, immigrants, migration_size))
+    conn.close()
+
+
+class IslandModel:
+    """
+    Evolves islands Populations independently, each migration_interval generations sending copies of every
+    island's migration_size fittest organisms to its neighbors in the topology, where they replace the least fit.
+    Islands step in lock step and every random draw is seeded, so a seed gives the same run whether the islands
+    are processes or run in this one.
+    """
+
+    def __init__(
+        self,
+        genome,
+        chromosome_len,
+        fitness_func,
+        islands=4,
+        migration_interval=10,
+        migration_size=2,
+        topology="ring",
+        num_generations=200,
+        threshold=0.999,
+        patience=0,
+        seed=None,
+        processes=True,
+        verbose=False,
+        **population_kwargs,
+    ):
+        """
+        :param genome:              a list of all valid genetic bases
+        :param chromosome_len:      the length of the target chromosome
+        :param fitness_func:        the function used to evaluate how "fit" an organism is, as for Population. It has
+                                    to be picklable if the islands are started with spawn or forkserver
+        :param islands:             (opt.) number of Populations, default 4
+        :param migration_interval:  (opt.) number of generations between migrations, default 10
+        :param migration_size:      (opt.) number of organisms each island sends per migration, at least 1, default 2
+        :param topology:            (opt.) which islands exchange migrants, "ring", "fully_connected", "random" or a
+                                    function (islands, rng) returning for each island the list of islands it
+                                    receives from, default "ring"
+        :param num_generations:     (opt.) the maximum number of generations, beyond initialization, default 200,
+                                    0 meaning no limit
+        :param threshold:           (opt.) stop once an organism's fitness reaches this threshold, default .999
+        :param patience:            (opt.) the number of generations that need to pass w/o the global best improving
+                                    for evolution to stop, checked at each migration, default 0 meaning off
+        :param seed:                (opt.) seed from which every island's seed is derived, default None
+        :param processes:           (opt.) run each island in its own process, default True, False runs them one
+                                    after another in this process
+        :param verbose:             (opt.) print the global fittest organism at every migration and why evolution
+                                    stopped, default False
+        :param population_kwargs:   (opt.) any other Population argument, e.g. generation_size or selection, used for
+                                    every island
+        :raises:                    ValueError if migration_size is less than 1
+        """
+        if migration_size < 1:
+            raise ValueError(f"migration_size must be at least 1, not {migration_size}")
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = TOPOLOGIES[topology] if isinstance(topology, str) else topology
+        self.num_generations = num_generations
+        self.threshold = threshold
+        self.patience = patience
+        self.processes = processes
+        self.verbose = verbose
+        self.population_kwargs = dict(
+            population_kwargs,
+            genome=genome,
+            chromosome_len=chromosome_len,
+            fitness_func=fitness_func,
+        )
+
+        seeds = np.random.SeedSequence(seed).spawn(islands + 1)
+        self.island_seeds = seeds[:islands]
+        self.rng = np.random.default_rng(seeds[islands])
+        # the Population whose settings are used to build the returned Organisms, it is never evolved
+        self._template = Population(**self.population_kwargs)
+        self.current_generation_index = 0
+
+    def fully_evolve_population(self):
+        """
+        Evolves the islands until the threshold, patience or the maximum number of generations is hit.
+        :return:    the most fit organism found on any island
+        """
+        start = self._start_processes if self.processes else self._start_local
+        step, stop, emigrants = start()
+        try:
+            return self._evolve(step, emigrants)
+        finally:
+            stop()
+
+    def _evolve(self, step, emigrants):
+        best = self._best(emigrants)
+        self.log("fittest organism:", self._organism(*best))
+        patience_counter = 0
+        while True:
+            generations = self.migration_interval
+            if self.num_generations:
+                generations = min(
+                    generations, self.num_generations - self.current_generation_index
+                )
+                if generations <= 0:
+                    break
+            immigrants = self._migrants(emigrants)
+            emigrants = step(generations, immigrants)
+            self.current_generation_index += generations
+
+            candidate = self._best(emigrants)
+            self.log("fittest organism:", self._organism(*candidate))
+            if candidate[1] > best[1]:
+                best = candidate
+                patience_counter = 0
+            else:
+                patience_counter += generations
+
+            if patience_counter >= self.patience != 0:
+                self.log(
+                    f"fitness has not improved in {self.patience} iterations, stopping early..."
+                )
+                break
+
+            if best[1] >= self.threshold:
+                self.log(f"fitness >= threshold {self.threshold}, stopping...")
+                break
+
+        return self._organism(*best)
+
+    def log(self, *message):
+        """
+        Prints message, converting it to text only if this IslandModel is verbose.
+        :param message: the objects to print
+        :return:        None
+        """
+        if self.verbose:
+            print(*message)
+
+    def _migrants(self, emigrants):
+        """
+        :param emigrants:   per island its fittest chromosomes and their fitness, then its best so far
+        :return:            per island the chromosomes and fitness it takes in
+        """
+        immigrants = []
+        for sources in self.topology(self.islands, self.rng):
+            chromosomes = np.concatenate([emigrants[j][0] for j in sources])
+            fitness = np.concatenate([emigrants[j][1] for j in sources])
+            # only the fittest migration_size of all incoming organisms settle
+            order = np.argsort(-fitness, kind="stable")[: self.migration_size]
+            immigrants.append((chromosomes[order], fitness[order]))
+        return immigrants
+
+    @staticmethod
+    def _best(emigrants):
+        """
+        :return:    the best chromosomes any island has seen and their fitness
+        """
+        island = int(np.argmax([best_fitness for *_, best_fitness in emigrants]))
+        *_, chromosomes, fitness = emigrants[island]
+        return chromosomes, float(fitness)
+
+    def _organism(self, chromosomes, fitness):
+        return Organism(
+            self._template.genes[chromosomes].tolist(),
+            self._template.fitness_func,
+            self._template.genome,
+            to_string=self._template.organism_to_string,
+            fitness=fitness,
+        )
+
+    def _start_local(self):
+        populations = [
+            Population(seed=seed, **self.population_kwargs)
+            for seed in self.island_seeds
+        ]
+        for population in populations:
+            population.initialize_generation()
+
+        def step(generations, immigrants):
+            return [
+                _evolve(population, generations, incoming, self.migration_size)
+                for population, incoming in zip(populations, immigrants)
+            ]
+
+        def stop():
+            for population in populations:
+                population.close()
+
+        emigrants = [
+            _emigrants(population, self.migration_size) for population in populations
+        ]
+        return step, stop, emigrants
+
+    def _start_processes(self):
+        connections, workers = [], []
+        for seed in self.island_seeds:
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_island_worker,
+                args=(child, self.population_kwargs, seed, self.migration_size),
+                daemon=True,
+            )
+            worker.start()
+            child.close()
+            connections.append(parent)
+            workers.append(worker)
+
+        def step(generations, immigrants):
+            # every island evolves at the same time, then all the results are collected
+            for conn, incoming in zip(connections, immigrants):
+                conn.send((generations, incoming))
+            return [conn.recv() for conn in connections]
+
+        def stop():
+            for conn in connections:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                conn.close()
+            for worker in workers:
+                worker.join()
+
+        return step, stop, [conn.recv() for conn in connections]
@@ -1,11 +1,14 @@
 # file:         main.py
 # description:  the main script file
 
-from open_sky import test_api
+import os
+
+import server
 
 
 def test_ga():
     import string
+    import numpy as np
     from genetic_algorithm import Population
 
     target = list("hello")
@@ -18,14 +21,9 @@ def test_ga():
     )
     chromosome_len = len(target)
 
-    def fitness_func(chromosomes):
-        char_correct = 0
-        for target_gene, chromosome_gene in zip(target, chromosomes):
-            if target_gene == chromosome_gene:
-                char_correct += 1
-
-        fitness = char_correct / chromosome_len
-        return fitness
+    def fitness_func(generation):
+        # fraction of characters in place, for every organism at once
+        return (generation == np.array(target)).mean(axis=1)
 
     def to_string(organism):
         return f"\n\tchromosomes: {''.join(organism.chromosomes)}\n\tfitness score = {organism.fitness}"
@@ -35,6 +33,8 @@ def test_ga():
         chromosome_len,
         fitness_func,
         organism_to_string=to_string,
+        batched=True,
+        verbose=True,
     )
 
     fittest = population.fully_evolve_population()
@@ -42,7 +42,6 @@ def test_ga():
 
 
 def test_voronoi():
-    import json
     from voronoi import bowyer_watson, voronoi_from_triangulation, Triangle
     import matplotlib.pyplot as plt
 
@@ -51,17 +50,57 @@ def test_voronoi():
         plt.plot([t.p1[0], t.p2[0]], [t.p1[1], t.p2[1]], c="b")
         plt.plot([t.p2[0], t.p3[0]], [t.p2[1], t.p3[1]], c="b")
         plt.plot([t.p1[0], t.p3[0]], [t.p1[1], t.p3[1]], c="b")
-    obj = voronoi_from_triangulation(triangulation, 0, 0, 12, 12)
-    edges = json.loads(obj)["edges"]
-    for e in edges:
-        plt.plot([e["x1"], e["x2"]], [e["y1"], e["y2"]])
+    diagram = voronoi_from_triangulation(triangulation, 0, 0, 12, 12, output="diagram")
+    for x1, y1, x2, y2 in diagram.edges:
+        plt.plot([x1, x2], [y1, y2])
     plt.xlim(0, 12)
     plt.ylim(0, 12)
     plt.savefig("test.png")
 
 
+def test_replay():
+    import asyncio
+    from ingest import Ingest, ReplaySource
+
+    # recorded frames with null callsigns, on ground flags, times and positions, as OpenSky returns them
+    source = ReplaySource(os.path.join(os.path.dirname(__file__), "data", "replay"))
+
+    async def run():
+        ingest = Ingest(source, {"DFW": (32.0, -98.0, 34.0, -96.0)})
+        async for name, states in ingest.stream():
+            print(
+                name,
+                states.snapshot_time,
+                list(zip(states.callsign.tolist(), states.on_ground.tolist())),
+            )
+        assert ingest.stats["errors"] == 0, ingest.stats
+        print(ingest.stats)
+
+    asyncio.run(run())
+
+
+def test_spherical_voronoi():
+    import numpy as np
+    from spherical_voronoi import spherical_voronoi, to_unit_vectors
+
+    # a 30 degree grid, each pole given at every longitude, and lon 180 repeating lon -180
+    points = [
+        (lon, lat) for lat in range(-90, 91, 30) for lon in range(-180, 180, 30)
+    ] + [(180, 0)]
+    cells = spherical_voronoi(points)["features"]
+    assert len(cells) == 5 * 12 + 2, len(cells)
+
+    # every corner of a cell is at least as close to the cell's site as to any other point
+    sites = to_unit_vectors(points)
+    for cell in cells:
+        corners = to_unit_vectors(cell["geometry"]["coordinates"][0])
+        site = sites[cell["properties"]["index"]]
+        assert ((corners @ sites.T).max(axis=1) <= corners @ site + 1e-9).all(), cell
+    print(f"{len(cells)} cells for {len(points)} points")
+
+
 def main():
-    test_api()
+    server.main()
 
 
 if __name__ == "__main__":
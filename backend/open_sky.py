@@ -4,21 +4,20 @@
 import matplotlib.pyplot as plt
 
 from pyopensky.rest import REST
-from geopy import Point
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 
-# TODO define some kind of dictionary for all valid airports
+import geodesy
+from airports import AirportIndex
+from ingest import StateBatch
 
 
 def test_api():
-    geolocator = Nominatim(user_agent="testApp")
-    location = geolocator.geocode("Dallas Fort Worth International Airport, Dallas, TX")
-    bbox = get_bbox(location.latitude, location.longitude, 1000)
+    airports = AirportIndex.load()
+    location = airports.lookup("DFW")
+    bbox = airports.bbox("DFW", 1000)
 
-    print((location.latitude, location.longitude))
+    print((location.lat, location.lon))
     print(tuple(bbox))
-    print(geodesic((bbox[0], bbox[1]), (bbox[2], bbox[3])).miles)
+    print(geodesy.vincenty(bbox[0], bbox[1], bbox[2], bbox[3]) / geodesy.MILE)
 
     # plt.scatter(location.latitude, location.longitude)
     # plt.plot([bbox[0], bbox[0]], [bbox[1], bbox[3]], 'r-')
@@ -28,20 +27,14 @@ def test_api():
     # plt.show()
 
     api = REST()
-    data = api.states()  # TODO fixme to use bounds
-    for flight in data.itertuples():
-        print(flight)
+    # pyopensky takes bounds as west, south, east, north
+    data = api.states(bounds=(bbox[1], bbox[0], bbox[3], bbox[2]))
+    states = StateBatch.from_frame(data)
+    print(f"{len(states)} aircraft at {states.snapshot_time}")
+    for icao24, lat, lon in zip(states.icao24, states.lat, states.lon):
+        print(icao24, lat, lon)
 
 
 def get_bbox(lat, lng, miles):
-    # sw, ne
-    bearings = [225, 45]
-    origin = Point(lat, lng)
-    l = []
-
-    for bearing in bearings:
-        destination = geodesic(miles=miles).destination(origin, bearing)
-        coords = destination.latitude, destination.longitude
-        l.extend(coords)
-    # xmin, ymin, xmax, ymax
-    return l
+    # sw, ne corners as lat_min, lon_min, lat_max, lon_max
+    return geodesy.bbox(lat, lng, miles).tolist()
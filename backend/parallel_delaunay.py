@@ -0,0 +1,223 @@
+"""
+File:   parallel_delaunay.py
+Description:    Delaunay triangulation of large point sets on several cores.
+                The points are split into vertical strips of equal size and
+                each strip is triangulated in a worker process inside the same
+                supertriangle as the serial algorithm. A strip triangle whose
+                circumcircle stays strictly between the neighboring strips is
+                already final, as no other point can fall in it. The vertices
+                of every other triangle are re-triangulated together, and of
+                that seam triangulation only the triangles whose circumcircle
+                holds none of the remaining points are kept. Cocircular
+                points are tie-broken by in_circle_perturbed, which decides
+                the same way in every strip and in the seam, so the result
+                equals the serial triangulation on grids too.
+"""
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from predicates import circumcenter_batch, in_circle_batch, in_circle_perturbed
+from voronoi import Triangle, find_supertriangle, _triangulate
+
+# below this many points per strip, process start up costs more than it saves
+MIN_POINTS_PER_WORKER = 5000
+
+
+def triangulate_parallel(points, workers):
+    """
+    Triangulates points in vertical strips on a process pool and stitches the
+    strips together
+    Arguments:
+        points: a list of tuples representing x, y coordinates
+        workers: number of worker processes
+    Returns:
+        vertices: points followed by the three supertriangle vertices
+        triangles: (t, 3) int32 array of counter-clockwise vertex indices,
+                   including the triangles attached to the supertriangle
+        neighbors: (t, 3) int32 array, neighbors[t][i] is the triangle across
+                   the edge opposite vertex i of triangle t
+    """
+    n = len(points)
+    supertriangle = find_supertriangle(points)
+    super_vertices = [supertriangle.p1, supertriangle.p2, supertriangle.p3]
+    strips = min(workers, n // MIN_POINTS_PER_WORKER)
+    if strips < 2:
+        return _serial(points, supertriangle)
+
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    chunks = np.array_split(np.argsort(coords[:, 0], kind="stable"), strips)
+    jobs = []
+    for i, chunk in enumerate(chunks):
+        x_low = coords[chunks[i - 1][-1], 0] if i > 0 else -np.inf
+        x_high = coords[chunks[i + 1][0], 0] if i + 1 < strips else np.inf
+        jobs.append((coords[chunk], chunk, super_vertices, x_low, x_high))
+    with ProcessPoolExecutor(strips) as pool:
+        results = list(pool.map(_triangulate_strip, jobs))
+
+    final = np.concatenate([r[0] for r in results])
+    seam_vertices = np.unique(np.concatenate([r[1] for r in results]))
+
+    # re-triangulate the seams in the same supertriangle, index n + i is
+    # supertriangle vertex i in both triangulations
+    _, seam, _ = _triangulate(
+        [points[i] for i in seam_vertices.tolist()], supertriangle
+    )
+    seam = np.asarray(seam, dtype=np.int64).reshape(-1, 3)
+    m = len(seam_vertices)
+    seam = np.where(seam < m, seam_vertices[np.minimum(seam, m - 1)], seam - m + n)
+    final_keys = set(map(tuple, np.sort(final, axis=1).tolist()))
+    seam = seam[[tuple(t) not in final_keys for t in np.sort(seam, axis=1).tolist()]]
+
+    vertices = list(points) + super_vertices
+    interior = np.setdiff1d(np.arange(n), seam_vertices)
+    seam = seam[_empty_circumcircles(vertices, seam, coords[interior])]
+    triangles = np.concatenate((final, seam))
+
+    # a triangulation of m distinct points inside a supertriangle has 2m + 1
+    # triangles, anything else means the stitching went wrong
+    if len(triangles) != 2 * len(np.unique(coords, axis=0)) + 1:
+        warnings.warn(
+            "parallel triangulation did not stitch, falling back to serial",
+            RuntimeWarning,
+        )
+        return _serial(points, supertriangle)
+    return vertices, triangles.astype(np.int32), _neighbors(triangles)
+
+
+def _serial(points, supertriangle):
+    vertices, tri_vertices, tri_neighbors = _triangulate(points, supertriangle)
+    return (
+        vertices,
+        np.array(tri_vertices, dtype=np.int32).reshape(-1, 3),
+        np.array(tri_neighbors, dtype=np.int32).reshape(-1, 3),
+    )
+
+
+def _triangulate_strip(job):
+    """
+    Triangulates one strip in a worker process
+    Returns:
+        final: (f, 3) array of global vertex indices of the final triangles
+        seam_vertices: global indices of the vertices of all other triangles
+    """
+    coords, indices, super_vertices, x_low, x_high = job
+    k = len(coords)
+    _, tri_vertices, _ = _triangulate(
+        [tuple(p) for p in coords.tolist()], Triangle(*super_vertices)
+    )
+    triangles = np.asarray(tri_vertices, dtype=np.int64).reshape(-1, 3)
+    real = (triangles < k).all(axis=1)
+
+    a = coords[np.minimum(triangles[:, 0], k - 1)]
+    centers = circumcenter_batch(
+        a,
+        coords[np.minimum(triangles[:, 1], k - 1)],
+        coords[np.minimum(triangles[:, 2], k - 1)],
+    )
+    radius = np.sqrt(((centers - a) ** 2).sum(axis=1))
+    margin = 1e-9 * (np.abs(centers[:, 0]) + radius)
+    with np.errstate(invalid="ignore"):
+        inside = (centers[:, 0] - radius - margin > x_low) & (
+            centers[:, 0] + radius + margin < x_high
+        )
+    final = real & inside
+
+    open_vertices = np.unique(triangles[~final])
+    open_vertices = open_vertices[open_vertices < k]
+    return indices[triangles[final]], indices[open_vertices]
+
+
+def _empty_circumcircles(vertices, triangles, points):
+    """
+    Checks that no point lies strictly inside each triangle's circumcircle,
+    looking only at the points bucketed in the grid cells the circle covers
+    Arguments:
+        vertices: list of x, y tuples indexed by triangles
+        triangles: (t, 3) array of counter-clockwise vertex indices
+        points: (n, 2) array of points to test against
+    Returns:
+        (t,) boolean array, True where the circumcircle is empty
+    """
+    empty = np.ones(len(triangles), dtype=bool)
+    if len(points) == 0 or len(triangles) == 0:
+        return empty
+    v = np.asarray(vertices, dtype=np.float64)
+    a = v[triangles[:, 0]]
+    centers = circumcenter_batch(a, v[triangles[:, 1]], v[triangles[:, 2]])
+    radius = np.sqrt(((centers - a) ** 2).sum(axis=1)) * (1 + 1e-9)
+
+    origin = points.min(axis=0)
+    size = max((points.max(axis=0) - origin).max(), 1e-12) / np.sqrt(len(points))
+    cells = np.floor((points - origin) / size).astype(np.int64)
+    shape = cells.max(axis=0) + 1
+    keys = cells[:, 0] * shape[1] + cells[:, 1]
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+
+    low = np.floor((centers - radius[:, None] - origin) / size).astype(np.int64)
+    high = np.floor((centers + radius[:, None] - origin) / size).astype(np.int64)
+    low = np.maximum(low, 0)
+    high = np.minimum(high, shape - 1)
+    # gather every (triangle, nearby point) pair, then test them all at once
+    pairs = []
+    for t in range(len(triangles)):
+        if (low[t] > high[t]).any():
+            continue  # the circle misses every point
+        if (high[t] - low[t] + 1).prod() > len(points):
+            near = np.arange(len(points))
+        else:
+            near = np.concatenate(
+                [
+                    order[
+                        np.searchsorted(
+                            keys, gx * shape[1] + low[t, 1]
+                        ) : np.searchsorted(
+                            keys, gx * shape[1] + high[t, 1], side="right"
+                        )
+                    ]
+                    for gx in range(low[t, 0], high[t, 0] + 1)
+                ]
+            )
+        near = near[((points[near] - centers[t]) ** 2).sum(axis=1) < radius[t] ** 2]
+        if len(near):
+            pairs.append(np.column_stack((np.full(len(near), t), near)))
+    if not pairs:
+        return empty
+    pairs = np.concatenate(pairs)
+    corners = v[triangles[pairs[:, 0]]]
+    signs = in_circle_batch(
+        corners[:, 0], corners[:, 1], corners[:, 2], points[pairs[:, 1]]
+    )
+    # cocircular points are settled by the same tie-break as the insertion
+    for i in np.flatnonzero(signs == 0).tolist():
+        t, p = pairs[i].tolist()
+        signs[i] = in_circle_perturbed(
+            *(vertices[j] for j in triangles[t].tolist()), tuple(points[p].tolist())
+        )
+    empty[pairs[signs > 0, 0]] = False
+    return empty
+
+
+def _neighbors(triangles):
+    """
+    Matches the edges of triangles to find their neighbors
+    Returns:
+        (t, 3) int32 array, neighbors[t][i] is the triangle across the edge
+        opposite vertex i of triangle t, -1 if there is none
+    """
+    count = len(triangles)
+    n = int(triangles.max()) + 1
+    starts = np.concatenate([triangles[:, (i + 1) % 3] for i in range(3)])
+    ends = np.concatenate([triangles[:, (i + 2) % 3] for i in range(3)])
+    keys = starts * n + ends
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    # the neighbor across a directed edge holds the same edge reversed
+    twin = ends * n + starts
+    position = np.minimum(np.searchsorted(sorted_keys, twin), len(keys) - 1)
+    found = sorted_keys[position] == twin
+    neighbors = np.where(found, order[position] % count, -1)
+    return neighbors.reshape(3, count).T.astype(np.int32)
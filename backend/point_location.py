@@ -0,0 +1,175 @@
+"""
+File:   point_location.py
+Description:    nearest site and containing triangle queries over a Delaunay
+                triangulation using jump-and-walk. A coarse grid built once
+                maps every query to a nearby site (the jump), then a greedy
+                walk over the Delaunay graph reaches the nearest site, since
+                on a Delaunay graph some neighbor is always closer until the
+                nearest site is reached. All queries in a batch walk in
+                lock step as NumPy array operations.
+"""
+
+import numpy as np
+
+from predicates import orient_batch
+
+
+class PointLocator:
+    """
+    Query index over the arrays of a TriangleMesh. Building it costs one pass
+    over the triangles plus a grid of about one cell per site.
+    """
+
+    def __init__(self, vertices, triangles, neighbors):
+        """
+        Arguments:
+            vertices: (n, 2) array of x, y coordinates
+            triangles: (t, 3) array of counter-clockwise vertex indices
+            neighbors: (t, 3) array of adjacent triangles, -1 on the hull
+        """
+        self.vertices = vertices
+        self.triangles = triangles
+        self.neighbors = neighbors
+        self._last_site = -1
+
+        # one incident triangle per vertex, -1 for vertices left out of the
+        # triangulation (duplicates)
+        self.vertex_triangle = np.full(len(vertices), -1, dtype=np.int64)
+        self.vertex_triangle[triangles.ravel()] = np.repeat(
+            np.arange(len(triangles)), 3
+        )
+
+        # Delaunay graph as compressed sparse rows
+        edges = np.concatenate(
+            (triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]])
+        ).astype(np.int64)
+        n = len(vertices)
+        keys = np.unique(
+            np.concatenate(
+                (edges[:, 0] * n + edges[:, 1], edges[:, 1] * n + edges[:, 0])
+            )
+        )
+        self.indices = keys % n
+        self.indptr = np.searchsorted(keys // n, np.arange(n + 1))
+
+        self._build_grid()
+
+    def _build_grid(self):
+        sites = np.flatnonzero(self.vertex_triangle != -1)
+        if len(sites) == 0:
+            raise ValueError("the triangulation has no triangles to query")
+        points = self.vertices[sites]
+        self.origin = points.min(axis=0)
+        extent = np.maximum(points.max(axis=0) - self.origin, 1e-12)
+        self.shape = np.maximum(
+            np.ceil(extent / extent.max() * np.sqrt(len(sites))), 1
+        ).astype(np.int64)
+        self.cell_size = extent / self.shape
+
+        grid = np.full(self.shape, -1, dtype=np.int64)
+        cells = self._cells(points)
+        grid[cells[:, 0], cells[:, 1]] = sites
+        # empty cells take a site from a filled neighbor cell
+        while (grid == -1).any():
+            for axis in (0, 1):
+                for step in (1, -1):
+                    shifted = np.full_like(grid, -1)
+                    if axis == 0:
+                        shifted[max(step, 0) : len(grid) + min(step, 0)] = grid[
+                            max(-step, 0) : len(grid) + min(-step, 0)
+                        ]
+                    else:
+                        shifted[:, max(step, 0) : grid.shape[1] + min(step, 0)] = grid[
+                            :, max(-step, 0) : grid.shape[1] + min(-step, 0)
+                        ]
+                    grid = np.where(grid == -1, shifted, grid)
+        self.grid = grid
+
+    def _cells(self, points):
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.shape - 1)
+
+    def nearest_site(self, points):
+        """
+        Finds the site closest to each point
+        Arguments:
+            points: a single (x, y) or an (n, 2) array of query points
+        Returns:
+            the vertex index of the nearest site, an (n,) array for a batch
+        """
+        queries = np.asarray(points, dtype=np.float64)
+        single = queries.ndim == 1
+        queries = queries.reshape(-1, 2)
+        cells = self._cells(queries)
+        start = self.grid[cells[:, 0], cells[:, 1]]
+        if single and self._last_site != -1:
+            # consecutive single queries are usually close to each other
+            last = self.vertices[self._last_site]
+            jump = self.vertices[start[0]]
+            if ((last - queries[0]) ** 2).sum() < ((jump - queries[0]) ** 2).sum():
+                start[0] = self._last_site
+        nearest = self._greedy_walk(queries, start)
+        if single:
+            self._last_site = int(nearest[0])
+            return self._last_site
+        return nearest
+
+    def locate(self, points):
+        """
+        Finds the triangle containing each point
+        Arguments:
+            points: a single (x, y) or an (n, 2) array of query points
+        Returns:
+            the index of the containing triangle, -1 outside the convex hull,
+            an (n,) array for a batch
+        """
+        queries = np.asarray(points, dtype=np.float64)
+        single = queries.ndim == 1
+        queries = queries.reshape(-1, 2)
+        nearest = self.nearest_site(queries)
+        result = self._visibility_walk(queries, self.vertex_triangle[nearest])
+        return int(result[0]) if single else result
+
+    def _greedy_walk(self, queries, current):
+        current = current.copy()
+        distance = ((self.vertices[current] - queries) ** 2).sum(axis=1)
+        active = np.arange(len(queries))
+        while len(active):
+            sites = current[active]
+            starts = self.indptr[sites]
+            counts = self.indptr[sites + 1] - starts
+            # neighbors of each site in a row, short rows repeat their last one
+            columns = np.minimum(np.arange(counts.max()), counts[:, None] - 1)
+            candidates = self.indices[starts[:, None] + columns]
+            d = ((self.vertices[candidates] - queries[active, None]) ** 2).sum(axis=2)
+            best = d.argmin(axis=1)
+            rows = np.arange(len(active))
+            best_distance = d[rows, best]
+            improved = best_distance < distance[active]
+            active = active[improved]
+            current[active] = candidates[rows[improved], best[improved]]
+            distance[active] = best_distance[improved]
+        return current
+
+    def _visibility_walk(self, queries, current):
+        current = current.copy()
+        active = np.arange(len(queries))
+        while len(active):
+            tri = self.triangles[current[active]]
+            q = queries[active]
+            v = self.vertices
+            outside = np.column_stack(
+                (
+                    orient_batch(v[tri[:, 1]], v[tri[:, 2]], q) < 0,
+                    orient_batch(v[tri[:, 2]], v[tri[:, 0]], q) < 0,
+                    orient_batch(v[tri[:, 0]], v[tri[:, 1]], q) < 0,
+                )
+            )
+            moving = outside.any(axis=1)
+            edge = outside.argmax(axis=1)
+            step = self.neighbors[current[active], edge]
+            current[active[moving & (step == -1)]] = -1
+            moving &= step != -1
+            current[active[moving]] = step[moving]
+            active = active[moving]
+        return current
@@ -0,0 +1,273 @@
+"""
+File:   predicates.py
+Description:    geometric predicates for the Delaunay triangulation. Every test
+                is evaluated in floating point first and only recomputed with
+                exact integer arithmetic when the result is too close to zero
+                to trust its sign (error bounds from Shewchuk's adaptive
+                predicates). Batched versions work on NumPy arrays of
+                candidate triangles and serve the whole-mesh tests, point
+                location and the parallel seam filter. Bowyer-Watson insertion
+                stays scalar, its cavity is found one triangle at a time.
+"""
+
+import numpy as np
+
+_EPSILON = np.finfo(np.float64).eps / 2.0
+_CCW_BOUND = (3.0 + 16.0 * _EPSILON) * _EPSILON
+_ICC_BOUND = (10.0 + 96.0 * _EPSILON) * _EPSILON
+_O3D_BOUND = (7.0 + 56.0 * _EPSILON) * _EPSILON
+
+
+def _scaled(*points):
+    """
+    Scales coordinates by a common power of two so that they are all integers,
+    which Python multiplies exactly and much faster than Fractions
+    Returns:
+        the integer coordinates of each point and the base 2 log of the scale
+    """
+    ratios = [[float(x).as_integer_ratio() for x in p] for p in points]
+    shift = max(d.bit_length() for r in ratios for _, d in r) - 1
+    return [[n << shift - d.bit_length() + 1 for n, d in r] for r in ratios], shift
+
+
+def _orient_exact(a, b, c):
+    ((ax, ay), (bx, by), (cx, cy)), shift = _scaled(a[:2], b[:2], c[:2])
+    return ((ax - cx) * (by - cy) - (ay - cy) * (bx - cx)) / (1 << 2 * shift)
+
+
+def _in_circle_exact(a, b, c, d):
+    ((ax, ay), (bx, by), (cx, cy), (dx, dy)), shift = _scaled(
+        a[:2], b[:2], c[:2], d[:2]
+    )
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+    return (
+        (adx * adx + ady * ady) * (bdx * cdy - cdx * bdy)
+        + (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy)
+        + (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady)
+    ) / (1 << 4 * shift)
+
+
+def _orient3d_exact(a, b, c, d):
+    ((ax, ay, az), (bx, by, bz), (cx, cy, cz), (dx, dy, dz)), shift = _scaled(
+        a, b, c, d
+    )
+    adx, ady, adz = ax - dx, ay - dy, az - dz
+    bdx, bdy, bdz = bx - dx, by - dy, bz - dz
+    cdx, cdy, cdz = cx - dx, cy - dy, cz - dz
+    return -(
+        adz * (bdx * cdy - cdx * bdy)
+        + bdz * (cdx * ady - adx * cdy)
+        + cdz * (adx * bdy - bdx * ady)
+    ) / (1 << 3 * shift)
+
+
+def orient(a, b, c):
+    """
+    Orientation test for three points
+    Arguments:
+        a, b, c: tuples representing x, y coordinates
+    Returns:
+        a positive value if a, b, c turn counter-clockwise, negative if they
+        turn clockwise and 0 if they are exactly collinear
+    """
+    detleft = (a[0] - c[0]) * (b[1] - c[1])
+    detright = (a[1] - c[1]) * (b[0] - c[0])
+    det = detleft - detright
+    bound = _CCW_BOUND * (abs(detleft) + abs(detright))
+    if det > bound or -det > bound:
+        return det
+    return _orient_exact(a, b, c)
+
+
+def in_circle(a, b, c, d):
+    """
+    In-circle test for a point against a counter-clockwise triangle, compares
+    squared distances through the lifted determinant so no sqrt is needed
+    Arguments:
+        a, b, c: counter-clockwise vertices of the triangle
+        d: the point to test
+    Returns:
+        a positive value if d lies inside the circumcircle of a, b, c,
+        negative if it lies outside and 0 if it lies exactly on it
+    """
+    adx, ady = a[0] - d[0], a[1] - d[1]
+    bdx, bdy = b[0] - d[0], b[1] - d[1]
+    cdx, cdy = c[0] - d[0], c[1] - d[1]
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    alift = adx * adx + ady * ady
+    blift = bdx * bdx + bdy * bdy
+    clift = cdx * cdx + cdy * cdy
+    det = (
+        alift * (bdxcdy - cdxbdy)
+        + blift * (cdxady - adxcdy)
+        + clift * (adxbdy - bdxady)
+    )
+    permanent = (
+        (abs(bdxcdy) + abs(cdxbdy)) * alift
+        + (abs(cdxady) + abs(adxcdy)) * blift
+        + (abs(adxbdy) + abs(bdxady)) * clift
+    )
+    bound = _ICC_BOUND * permanent
+    if det > bound or -det > bound:
+        return det
+    return _in_circle_exact(a, b, c, d)
+
+
+def in_circle_perturbed(a, b, c, d):
+    """
+    In-circle test that never answers "on the circle" for distinct points, so
+    four or more cocircular points, as on a grid, are triangulated the same
+    way whatever order they are inserted in. Ties are broken by simulation of
+    simplicity: every point is lifted by an infinitesimal that is larger the
+    greater the point is in (x, y) order, and the sign is taken from the
+    first lifted point whose cofactor is not zero. The order depends only on
+    the coordinates, so separate triangulations that share points agree
+    Arguments:
+        a, b, c: counter-clockwise vertices of the triangle
+        d: the point to test
+    Returns:
+        the sign of in_circle where it is not zero, otherwise the sign after
+        the perturbation, 0 only if d coincides with a, b or c
+    """
+    det = in_circle(a, b, c, d)
+    if det != 0 or tuple(d) in (tuple(a), tuple(b), tuple(c)):
+        return det
+    cofactors = sorted(
+        (
+            (tuple(a), orient(b, c, d)),
+            (tuple(b), -orient(a, c, d)),
+            (tuple(c), orient(a, b, d)),
+            (tuple(d), -orient(a, b, c)),
+        ),
+        reverse=True,
+    )
+    for _, cofactor in cofactors:
+        if cofactor != 0:
+            return cofactor
+    return 0.0
+
+
+def orient3d(a, b, c, d):
+    """
+    Orientation test for a point against the plane through three points
+    Arguments:
+        a, b, c, d: tuples representing x, y, z coordinates
+    Returns:
+        a positive value if d lies on the side of the plane through a, b, c
+        that (b - a) x (c - a) points to, negative if it lies on the other
+        side and 0 if the four points are exactly coplanar
+    """
+    adx, ady, adz = a[0] - d[0], a[1] - d[1], a[2] - d[2]
+    bdx, bdy, bdz = b[0] - d[0], b[1] - d[1], b[2] - d[2]
+    cdx, cdy, cdz = c[0] - d[0], c[1] - d[1], c[2] - d[2]
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    det = adz * (bdxcdy - cdxbdy) + bdz * (cdxady - adxcdy) + cdz * (adxbdy - bdxady)
+    permanent = (
+        (abs(bdxcdy) + abs(cdxbdy)) * abs(adz)
+        + (abs(cdxady) + abs(adxcdy)) * abs(bdz)
+        + (abs(adxbdy) + abs(bdxady)) * abs(cdz)
+    )
+    bound = _O3D_BOUND * permanent
+    if det > bound or -det > bound:
+        return -det
+    return _orient3d_exact(a, b, c, d)
+
+
+def orient_batch(a, b, c):
+    """
+    Orientation test for arrays of point triples
+    Arguments:
+        a, b, c: (n, 2) arrays of x, y coordinates
+    Returns:
+        (n,) array with the sign convention of orient
+    """
+    a, b, c = (np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in (a, b, c))
+    detleft = (a[:, 0] - c[:, 0]) * (b[:, 1] - c[:, 1])
+    detright = (a[:, 1] - c[:, 1]) * (b[:, 0] - c[:, 0])
+    det = detleft - detright
+    bound = _CCW_BOUND * (np.abs(detleft) + np.abs(detright))
+    for i in np.flatnonzero(np.abs(det) <= bound):
+        det[i] = _orient_exact(a[i].tolist(), b[i].tolist(), c[i].tolist())
+    return det
+
+
+def in_circle_batch(a, b, c, d):
+    """
+    In-circle test for arrays of counter-clockwise triangles against points
+    Arguments:
+        a, b, c: (n, 2) arrays holding the vertices of each triangle
+        d: (n, 2) array of points, or a single point tested against every
+           triangle
+    Returns:
+        (n,) array with the sign convention of in_circle
+    """
+    a, b, c = (np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in (a, b, c))
+    d = np.broadcast_to(np.asarray(d, dtype=np.float64), a.shape)
+    ad, bd, cd = a - d, b - d, c - d
+    bdxcdy, cdxbdy = bd[:, 0] * cd[:, 1], cd[:, 0] * bd[:, 1]
+    cdxady, adxcdy = cd[:, 0] * ad[:, 1], ad[:, 0] * cd[:, 1]
+    adxbdy, bdxady = ad[:, 0] * bd[:, 1], bd[:, 0] * ad[:, 1]
+    alift = (ad * ad).sum(axis=1)
+    blift = (bd * bd).sum(axis=1)
+    clift = (cd * cd).sum(axis=1)
+    det = (
+        alift * (bdxcdy - cdxbdy)
+        + blift * (cdxady - adxcdy)
+        + clift * (adxbdy - bdxady)
+    )
+    permanent = (
+        (np.abs(bdxcdy) + np.abs(cdxbdy)) * alift
+        + (np.abs(cdxady) + np.abs(adxcdy)) * blift
+        + (np.abs(adxbdy) + np.abs(bdxady)) * clift
+    )
+    for i in np.flatnonzero(np.abs(det) <= _ICC_BOUND * permanent):
+        det[i] = _in_circle_exact(
+            a[i].tolist(), b[i].tolist(), c[i].tolist(), d[i].tolist()
+        )
+    return det
+
+
+def circumcenter(a, b, c):
+    """
+    Finds the circumcenter of a triangle
+    Arguments:
+        a, b, c: tuples representing x, y coordinates
+    Returns:
+        the circumcenter as an x, y tuple
+    Raises:
+        ValueError if the points are collinear and have no circumcenter
+    """
+    bx, by = b[0] - a[0], b[1] - a[1]
+    cx, cy = c[0] - a[0], c[1] - a[1]
+    d = 2.0 * (bx * cy - by * cx)
+    if d == 0 or orient(a, b, c) == 0:
+        raise ValueError(f"points {a}, {b}, {c} are collinear, no circumcenter")
+    b2 = bx * bx + by * by
+    c2 = cx * cx + cy * cy
+    return (a[0] + (cy * b2 - by * c2) / d, a[1] + (bx * c2 - cx * b2) / d)
+
+
+def circumcenter_batch(a, b, c):
+    """
+    Finds the circumcenters of arrays of triangles
+    Arguments:
+        a, b, c: (n, 2) arrays holding the vertices of each triangle
+    Returns:
+        (n, 2) array of circumcenters, inf or nan for collinear triangles
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 2) - a
+    c = np.asarray(c, dtype=np.float64).reshape(-1, 2) - a
+    b2 = (b * b).sum(axis=1)
+    c2 = (c * c).sum(axis=1)
+    d = 2.0 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (c[:, 1] * b2 - b[:, 1] * c2) / d
+        y = (b[:, 0] * c2 - c[:, 0] * b2) / d
+    return a + np.column_stack((x, y))
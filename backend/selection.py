@@ -0,0 +1,93 @@
+# file:         selection.py
+# description:  parent selection strategies for the GA, each drawing every parent of a generation in one vectorized
+#               step: select(fitness, count, rng) -> array of count indices into fitness
+
+import numpy as np
+
+
+def _weights(fitness):
+    """
+    :param fitness: vector of fitness values
+    :return:        cumulative selection weights, uniform if no organism has any fitness
+    :raises:        ValueError if any fitness is negative
+    """
+    fitness = np.asarray(fitness, dtype=np.float64)
+    if (fitness < 0).any():
+        raise ValueError("fitness proportionate selection needs non-negative fitness")
+    cumulative = np.cumsum(fitness)
+    if (
+        len(cumulative) == 0
+        or not cumulative[-1] > 0
+        or not np.isfinite(cumulative[-1])
+    ):
+        return np.arange(1, len(fitness) + 1, dtype=np.float64)
+    return cumulative
+
+
+def roulette(fitness, count, rng):
+    """
+    Roulette wheel selection, each organism is drawn with probability proportional to its fitness. The wheel is
+    built once per generation and every draw is a binary search on it.
+    :param fitness: vector of fitness values
+    :param count:   number of parents to draw
+    :param rng:     the numpy Generator to draw from
+    :return:        array of count indices into fitness
+    """
+    cumulative = _weights(fitness)
+    spins = rng.random(count) * cumulative[-1]
+    return np.minimum(
+        np.searchsorted(cumulative, spins, side="right"), len(cumulative) - 1
+    )
+
+
+def stochastic_universal_sampling(fitness, count, rng):
+    """
+    Roulette wheel selection with count evenly spaced pointers and a single spin, so each organism is drawn within
+    one of its expected number of times. The parents come back shuffled so pairs are random.
+    :param fitness: vector of fitness values
+    :param count:   number of parents to draw
+    :param rng:     the numpy Generator to draw from
+    :return:        array of count indices into fitness
+    """
+    cumulative = _weights(fitness)
+    step = cumulative[-1] / count
+    pointers = (rng.random() + np.arange(count)) * step
+    parents = np.searchsorted(cumulative, pointers, side="right")
+    return rng.permutation(np.minimum(parents, len(cumulative) - 1))
+
+
+def tournament(fitness, count, rng, size=2):
+    """
+    Tournament selection, each parent is the fittest of size organisms drawn uniformly. Only the order of the
+    fitness values matters, so any fitness scale works.
+    :param fitness: vector of fitness values
+    :param count:   number of parents to draw
+    :param rng:     the numpy Generator to draw from
+    :param size:    (opt.) number of organisms per tournament, default 2
+    :return:        array of count indices into fitness
+    """
+    fitness = np.asarray(fitness)
+    entrants = rng.integers(len(fitness), size=(count, size))
+    winners = fitness[entrants].argmax(axis=1)
+    return entrants[np.arange(count), winners]
+
+
+def rank(fitness, count, rng):
+    """
+    Linear rank selection, the organism ranked r-th from the bottom of n is drawn with probability proportional to
+    r, which keeps selection pressure steady however the fitness values are spread.
+    :param fitness: vector of fitness values
+    :param count:   number of parents to draw
+    :param rng:     the numpy Generator to draw from
+    :return:        array of count indices into fitness
+    """
+    order = np.argsort(np.asarray(fitness), kind="stable")
+    return order[roulette(np.arange(1, len(order) + 1), count, rng)]
+
+
+SELECTIONS = {
+    "roulette": roulette,
+    "sus": stochastic_universal_sampling,
+    "tournament": tournament,
+    "rank": rank,
+}
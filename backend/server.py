@@ -0,0 +1,670 @@
+# file:         server.py
+# description:  long-running asyncio HTTP service for the frontend. Serves the aircraft around an airport, the
+#               Voronoi diagram of a point set and GA route optimization as JSON. Results are cached by a hash of
+#               their inputs with a TTL and LRU eviction, identical requests arriving together share one computation,
+#               CPU-bound work runs in a process pool and responses are gzipped for clients that accept it.
+#
+#               GET  /aircraft?airport=DFW&miles=50
+#               POST /voronoi   {"points": [[x, y], ...], "bounds": [min_x, min_y, max_x, max_y], "lonlat": false}
+#               POST /voronoi   {"points": [[lon, lat], ...], "lonlat": true}   cells on the sphere as GeoJSON
+#               POST /route     {"origin": [lat, lon], "destination": [lat, lon], "obstacles": [[lat, lon], ...]}
+#               GET  /health
+#
+#               python server.py --port 8080 --workers 4
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+import geodesy
+
+# bodies smaller than this are sent uncompressed, gzip would barely shrink them
+MIN_COMPRESS_SIZE = 1024
+MAX_BODY_SIZE = 16 * 2**20
+# largest requests the endpoints accept, so one request cannot tie up a worker or exhaust its memory
+MAX_POINTS = 100_000
+MAX_WAYPOINTS = 50
+MAX_GENERATIONS = 2000
+MAX_OBSTACLES = 1000
+# widest radius around an airport, OpenSky charges more credits the larger the bounding box
+MAX_MILES = 500
+# seconds results stay cached, aircraft positions only change every OpenSky poll
+TTL = {"aircraft": 10.0, "voronoi": 3600.0, "route": 3600.0}
+
+logger = logging.getLogger(__name__)
+
+_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class CachedResult:
+    """
+    A serialized response body and its gzipped form, compressed the first time a client asks for it.
+    """
+
+    __slots__ = ("key", "body", "expires", "_gzipped")
+
+    def __init__(self, key, body, expires):
+        self.key = key
+        self.body = body
+        self.expires = expires
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class ResultCache:
+    """
+    Least recently used cache of results keyed by a hash of their inputs, where entries also expire ttl seconds after
+    they were computed. Holds at most max_size entries, evicting the least recently used one when full.
+    """
+
+    def __init__(self, max_size=256):
+        """
+        :param max_size:    (opt.) the maximum number of results to keep, default 256
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    @staticmethod
+    def key(endpoint, params):
+        """
+        :param endpoint:    the endpoint's name
+        :param params:      JSON serializable inputs of the result
+        :return:            hex digest of the endpoint and its canonically serialized inputs
+        """
+        canonical = json.dumps(
+            [endpoint, params], sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """
+        :param key: the hash of a result's inputs
+        :return:    the CachedResult, None on a miss or if it has expired
+        """
+        result = self._results.get(key)
+        if result is not None and result.expires <= time.monotonic():
+            del self._results[key]
+            self.expirations += 1
+            result = None
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(key)
+        return result
+
+    def put(self, result):
+        """
+        :param result:  a CachedResult
+        :return:        None
+        """
+        self._results[result.key] = result
+        self._results.move_to_end(result.key)
+        if len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        :return:    dict of hits, misses, evictions, expirations, hit rate and current size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self),
+        }
+
+
+def _finite(values):
+    return [v if math.isfinite(v) else None for v in values]
+
+
+def compute_voronoi(points, bounds, lonlat):
+    """
+    Runs in a worker process.
+    :param points:  list of x, y points, or lon, lat points when lonlat
+    :param bounds:  (min_x, min_y, max_x, max_y) the diagram is clipped to, unused when lonlat
+    :param lonlat:  find the cells of lon, lat points on the sphere instead of treating them as plain x, y
+    :return:        the diagram as the dict VoronoiDiagram.to_dict gives, or a GeoJSON FeatureCollection of one
+                    polygon per distinct point when lonlat
+    :raises:        ValueError when lonlat points are fewer than 4 distinct points or all lie on one great circle
+    """
+    if lonlat:
+        from spherical_voronoi import spherical_voronoi
+
+        return spherical_voronoi(points)
+
+    from voronoi import bowyer_watson, voronoi_from_triangulation
+
+    triangulation = bowyer_watson([tuple(p) for p in points])
+    diagram = voronoi_from_triangulation(triangulation, *bounds, output="diagram")
+    return diagram.to_dict()
+
+
+class RouteFitness:
+    """
+    Batched fitness of routes made of waypoints offset sideways from the straight line between two points, the
+    shorter the route and the further from every obstacle the better.
+    """
+
+    def __init__(self, waypoints, obstacles, clearance):
+        """
+        :param waypoints:   function mapping a generation of offset matrices to (n, waypoints + 2, 2) routes
+        :param obstacles:   (m, 2) array of obstacle x, y in metres
+        :param clearance:   distance in metres a route should keep from obstacles
+        """
+        self.waypoints = waypoints
+        self.obstacles = obstacles
+        self.clearance = clearance
+
+    def __call__(self, offsets):
+        routes = self.waypoints(offsets)
+        legs = np.diff(routes, axis=1)
+        length = np.linalg.norm(legs, axis=2).sum(axis=1)
+        direct = np.linalg.norm(routes[:, -1] - routes[:, 0], axis=1)
+        penalty = np.zeros(len(routes))
+        if len(self.obstacles):
+            # sample each leg and measure how far inside the clearance of an obstacle it gets
+            t = np.linspace(0.0, 1.0, 8)[None, None, :, None]
+            samples = routes[:, :-1, None, :] + t * legs[:, :, None, :]
+            gaps = np.linalg.norm(
+                samples[..., None, :] - self.obstacles[None, None, None], axis=-1
+            )
+            intrusion = np.clip(1.0 - gaps / self.clearance, 0.0, None)
+            penalty = intrusion.max(axis=(2, 3)).sum(axis=1)
+        return direct / length / (1.0 + penalty)
+
+
+def optimize_route(
+    origin, destination, obstacles, clearance_miles, waypoints, generations, seed
+):
+    """
+    Runs in a worker process, searching for a route between two points that stays clear of obstacles such as other
+    aircraft with the genetic algorithm.
+    :param origin:          (lat, lon) of the start
+    :param destination:     (lat, lon) of the end
+    :param obstacles:       list of (lat, lon) to keep clear of
+    :param clearance_miles: distance to keep from every obstacle in miles
+    :param waypoints:       number of waypoints between origin and destination
+    :param generations:     the maximum number of generations
+    :param seed:            seed of the genetic algorithm
+    :return:                dict of the route as a list of [lat, lon], its length in miles and its fitness
+    """
+    from genetic_algorithm import Population
+
+    lats = [origin[0], destination[0]] + [o[0] for o in obstacles]
+    lons = [origin[1], destination[1]] + [o[1] for o in obstacles]
+    projection = geodesy.LocalProjection.centered(lats, lons)
+    xy = projection.points(lats, lons)
+    start, end, obstacle_xy = xy[0], xy[1], xy[2:]
+    direct = end - start
+    normal = np.array([-direct[1], direct[0]]) / max(np.linalg.norm(direct), 1e-9)
+    along = np.linspace(0.0, 1.0, waypoints + 2)[1:-1]
+    clearance = clearance_miles * geodesy.MILE
+    # sideways offsets of up to a quarter of the direct distance either side
+    genome = list(np.linspace(-0.25, 0.25, 21) * np.linalg.norm(direct))
+
+    def to_routes(offsets):
+        middle = (
+            start
+            + along[None, :, None] * direct
+            + np.asarray(offsets, dtype=np.float64)[..., None] * normal
+        )
+        ends = np.broadcast_to(start, (len(middle), 1, 2)), np.broadcast_to(
+            end, (len(middle), 1, 2)
+        )
+        return np.concatenate((ends[0], middle, ends[1]), axis=1)
+
+    population = Population(
+        genome,
+        waypoints,
+        RouteFitness(to_routes, obstacle_xy, clearance),
+        generation_size=200,
+        num_generations=generations,
+        threshold=1.0,
+        patience=25,
+        seed=seed,
+        batched=True,
+        selection="tournament",
+        elitism=2,
+    )
+    best = population.fully_evolve_population()
+    route = to_routes([best.chromosomes])[0]
+    lat, lon = projection.unproject(route)
+    return {
+        "route": np.column_stack((lat, lon)).tolist(),
+        "miles": float(
+            geodesy.vincenty(lat[:-1], lon[:-1], lat[1:], lon[1:]).sum() / geodesy.MILE
+        ),
+        "fitness": float(best.fitness),
+        "generations": population.current_generation_index,
+    }
+
+
+class Server:
+    """
+    The HTTP service. Every endpoint goes through cached(), which returns a fresh cached result, joins a computation
+    of the same inputs already in flight or starts a new one.
+    """
+
+    def __init__(self, workers=None, cache_size=256, source=None, airports=None):
+        """
+        :param workers:     (opt.) number of worker processes, default None meaning one per core
+        :param cache_size:  (opt.) the maximum number of cached results, default 256
+        :param source:      (opt.) an ingest source with async fetch(bbox), default None meaning an OpenSkySource
+                            created on the first aircraft request
+        :param airports:    (opt.) an AirportIndex, default None meaning the bundled dataset
+        """
+        self.workers = workers
+        self.cache = ResultCache(cache_size)
+        self.source = source
+        self.airports = airports
+        self.pool = None
+        self.stats = {"requests": 0, "computed": 0, "joined": 0, "not_modified": 0}
+        self._in_flight = {}
+        self._routes = {
+            ("GET", "/aircraft"): self.aircraft,
+            ("POST", "/voronoi"): self.voronoi,
+            ("POST", "/route"): self.route,
+            ("GET", "/health"): self.health,
+        }
+
+    async def cached(self, endpoint, params, compute):
+        """
+        :param endpoint:    the endpoint's name, picking its TTL
+        :param params:      JSON serializable inputs the result depends on
+        :param compute:     coroutine function returning the JSON serializable result
+        :return:            a CachedResult
+        """
+        key = self.cache.key(endpoint, params)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, endpoint, compute))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.stats["joined"] += 1
+        # one client hanging up does not cancel the computation the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, endpoint, compute):
+        self.stats["computed"] += 1
+        body = json.dumps(await compute(), separators=(",", ":")).encode()
+        result = CachedResult(key, body, time.monotonic() + TTL[endpoint])
+        self.cache.put(result)
+        return result
+
+    async def run_in_pool(self, func, *args):
+        if self.pool is None:
+            # spawned rather than forked, forked workers would hold on to copies of open client sockets
+            self.pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def aircraft(self, query, body):
+        from airports import AirportIndex
+        from ingest import OpenSkySource
+
+        code = query.get("airport", "").upper()
+        miles = _number(query.get("miles", 50), "miles")
+        if not 0 < miles <= MAX_MILES:
+            raise HTTPError(400, f"miles has to be above 0 and at most {MAX_MILES}")
+        if self.airports is None:
+            self.airports = AirportIndex.load()
+        if code not in self.airports:
+            raise HTTPError(404, f"unknown airport {code!r}")
+        airport = self.airports.lookup(code)
+        bbox = self.airports.bbox(code, miles)
+
+        async def compute():
+            if self.source is None:
+                self.source = OpenSkySource()
+            try:
+                states = await self.source.fetch(bbox)
+            except Exception as e:
+                raise HTTPError(502, f"OpenSky request failed: {e}") from e
+            distance = geodesy.vincenty(
+                airport.lat, airport.lon, states.lat, states.lon
+            )
+            return {
+                "airport": {
+                    "code": code,
+                    "name": airport.name,
+                    "lat": airport.lat,
+                    "lon": airport.lon,
+                },
+                "bbox": bbox,
+                "snapshot_time": states.snapshot_time,
+                "aircraft": [
+                    {
+                        "icao24": icao24,
+                        "callsign": callsign,
+                        "lat": lat,
+                        "lon": lon,
+                        "altitude": altitude,
+                        "velocity": velocity,
+                        "heading": heading,
+                        "on_ground": on_ground,
+                        "miles": miles_away,
+                    }
+                    for icao24, callsign, lat, lon, altitude, velocity, heading, on_ground, miles_away in zip(
+                        states.icao24.tolist(),
+                        states.callsign.tolist(),
+                        states.lat.tolist(),
+                        states.lon.tolist(),
+                        _finite(states.altitude.tolist()),
+                        _finite(states.velocity.tolist()),
+                        _finite(states.heading.tolist()),
+                        states.on_ground.tolist(),
+                        (np.atleast_1d(distance) / geodesy.MILE).tolist(),
+                    )
+                ],
+            }
+
+        return await self.cached("aircraft", {"bbox": bbox, "code": code}, compute)
+
+    async def voronoi(self, query, body):
+        points = body.get("points")
+        if not isinstance(points, list) or len(points) < 3:
+            raise HTTPError(400, "points needs at least 3 [x, y] pairs")
+        try:
+            points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        except (TypeError, ValueError):
+            raise HTTPError(400, "points have to be [x, y] pairs of numbers")
+        if not np.isfinite(points).all():
+            raise HTTPError(400, "points have to be finite")
+        lonlat = bool(body.get("lonlat", False))
+        bounds = body.get("bounds")
+        if len(points) > MAX_POINTS:
+            raise HTTPError(400, f"at most {MAX_POINTS} points are accepted")
+        if lonlat:
+            # cells cover the whole sphere, there is nothing to clip them to
+            if (np.abs(points[:, 1]) > 90).any():
+                raise HTTPError(400, "latitudes have to be between -90 and 90")
+            bounds = None
+        else:
+            if bounds is None:
+                low, high = points.min(axis=0), points.max(axis=0)
+                margin = (high - low).max() * 0.1 + 1e-6
+                bounds = [*(low - margin).tolist(), *(high + margin).tolist()]
+            if not isinstance(bounds, list) or len(bounds) != 4:
+                raise HTTPError(400, "bounds has to be [min_x, min_y, max_x, max_y]")
+            bounds = [_number(b, "bounds") for b in bounds]
+        points = points.tolist()
+
+        async def compute():
+            try:
+                return await self.run_in_pool(compute_voronoi, points, bounds, lonlat)
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from e
+
+        return await self.cached(
+            "voronoi", {"points": points, "bounds": bounds, "lonlat": lonlat}, compute
+        )
+
+    async def route(self, query, body):
+        try:
+            origin = [_number(v, "origin") for v in body["origin"]]
+            destination = [_number(v, "destination") for v in body["destination"]]
+            obstacles = [
+                [_number(v, "obstacles") for v in o] for o in body.get("obstacles", [])
+            ]
+        except (KeyError, TypeError):
+            raise HTTPError(400, "origin and destination have to be [lat, lon]")
+        if (
+            len(origin) != 2
+            or len(destination) != 2
+            or any(len(o) != 2 for o in obstacles)
+        ):
+            raise HTTPError(400, "points have to be [lat, lon]")
+        params = {
+            "origin": origin,
+            "destination": destination,
+            "obstacles": obstacles,
+            "clearance_miles": _number(
+                body.get("clearance_miles", 5), "clearance_miles"
+            ),
+            "waypoints": int(_number(body.get("waypoints", 8), "waypoints")),
+            "generations": int(_number(body.get("generations", 200), "generations")),
+            "seed": int(_number(body.get("seed", 0), "seed")),
+        }
+        if params["waypoints"] < 1 or params["clearance_miles"] <= 0:
+            raise HTTPError(400, "waypoints and clearance_miles have to be positive")
+        if params["generations"] < 1:
+            raise HTTPError(400, "generations has to be positive")
+        if (
+            params["waypoints"] > MAX_WAYPOINTS
+            or params["generations"] > MAX_GENERATIONS
+            or len(obstacles) > MAX_OBSTACLES
+        ):
+            raise HTTPError(
+                400,
+                f"at most {MAX_WAYPOINTS} waypoints, {MAX_GENERATIONS} generations "
+                f"and {MAX_OBSTACLES} obstacles are accepted",
+            )
+        if geodesy.vincenty(*origin, *destination) < 1.0:
+            raise HTTPError(400, "origin and destination have to be different")
+        return await self.cached(
+            "route",
+            params,
+            lambda: self.run_in_pool(optimize_route, *params.values()),
+        )
+
+    async def health(self, query, body):
+        # never cached, the stats change with every request
+        body = json.dumps(
+            {"requests": self.stats, "cache": self.cache.stats()}, separators=(",", ":")
+        ).encode()
+        return CachedResult("", body, 0.0)
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of one connection, keeping it open between requests unless the client asks to close it
+        or speaks HTTP/1.0 without asking for keep-alive.
+        """
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                self.stats["requests"] += 1
+                await self.respond(writer, method, target, headers, body)
+                # HTTP/1.0 connections close after each request unless the client asks for keep-alive
+                connection = headers.get("connection", "").lower()
+                if connection == "close" or (
+                    version == "HTTP/1.0" and connection != "keep-alive"
+                ):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            await self.send(writer, e.status, _error(e), {})
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, target, headers, body):
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        if method == "OPTIONS":
+            return await self.send(writer, 200, b"", headers)
+        handler = self._routes.get((method, url.path))
+        try:
+            if handler is None:
+                if any(path == url.path for _, path in self._routes):
+                    raise HTTPError(405, f"{method} not allowed on {url.path}")
+                raise HTTPError(404, f"no endpoint {url.path}")
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                raise HTTPError(400, "body is not valid JSON")
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "body has to be a JSON object")
+            result = await handler(query, payload)
+        except HTTPError as e:
+            return await self.send(writer, e.status, _error(e), headers)
+        except Exception:
+            logger.exception("%s %s failed", method, url.path)
+            return await self.send(
+                writer, 500, _error(HTTPError(500, "internal server error")), headers
+            )
+
+        if result.key and headers.get("if-none-match") == f'"{result.key}"':
+            self.stats["not_modified"] += 1
+            return await self.send(writer, 304, b"", headers, result)
+        await self.send(writer, 200, result.body, headers, result)
+
+    async def send(self, writer, status, body, request_headers, result=None):
+        headers = {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+            "Vary": "Accept-Encoding",
+        }
+        if result is not None and result.key:
+            headers["ETag"] = f'"{result.key}"'
+            headers["Cache-Control"] = (
+                f"max-age={max(int(result.expires - time.monotonic()), 0)}"
+            )
+        accepts_gzip = "gzip" in request_headers.get("accept-encoding", "")
+        if accepts_gzip and len(body) >= MIN_COMPRESS_SIZE:
+            body = result.gzipped if result is not None else gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(body))
+        head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+    async def serve(self, host="0.0.0.0", port=8080):
+        """
+        Serves until cancelled.
+        :param host:    (opt.) address to listen on, default all interfaces
+        :param port:    (opt.) port to listen on, default 8080
+        :return:        None
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+
+def _number(value, name):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} has to be a number")
+    if not math.isfinite(value):
+        raise HTTPError(400, f"{name} has to be finite")
+    return value
+
+
+def _error(error):
+    return json.dumps({"error": str(error)}).encode()
+
+
+async def _read_request(reader):
+    """
+    :return:    (method, target, HTTP version, headers with lower case names, body bytes), None once the client closes
+                the connection
+    :raises:    HTTPError for a malformed or oversized request
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "request headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "Content-Length has to be a number")
+    if length < 0:
+        raise HTTPError(400, "Content-Length cannot be negative")
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version.strip().upper(), headers, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="serve the backend over HTTP")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = Server(workers=args.workers, cache_size=args.cache_size)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
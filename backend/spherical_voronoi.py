@@ -0,0 +1,195 @@
+"""
+File:   spherical_voronoi.py
+Description:    Delaunay triangulation and Voronoi diagram of lon/lat points on
+                the sphere. The spherical Delaunay triangulation is the convex
+                hull of the points as unit vectors, which is built with the
+                same cavity insertion as bowyer_watson: a face is "bad" when
+                the new point can see it from outside the hull. The Voronoi
+                cells come out as GeoJSON polygons that d3 can draw directly.
+"""
+
+import numpy as np
+
+from predicates import orient3d
+from voronoi import hilbert_order, _insert_point
+
+
+def to_unit_vectors(points):
+    """
+    Converts lon/lat points to unit vectors
+    Arguments:
+        points: a list of (lon, lat) tuples in degrees
+    Returns:
+        (n, 3) array of x, y, z unit vectors
+    """
+    lonlat = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    cos_lat = np.cos(lonlat[:, 1])
+    return np.column_stack(
+        (
+            cos_lat * np.cos(lonlat[:, 0]),
+            cos_lat * np.sin(lonlat[:, 0]),
+            np.sin(lonlat[:, 1]),
+        )
+    )
+
+
+def to_lonlat(vectors):
+    """
+    Converts vectors to lon/lat points
+    Arguments:
+        vectors: (n, 3) array of x, y, z vectors, need not be normalized
+    Returns:
+        (n, 2) array of (lon, lat) in degrees
+    """
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    lon = np.degrees(np.arctan2(vectors[:, 1], vectors[:, 0]))
+    lat = np.degrees(np.arctan2(vectors[:, 2], np.hypot(vectors[:, 0], vectors[:, 1])))
+    return np.column_stack((lon, lat))
+
+
+def _initial_tetrahedron(vertices):
+    """
+    Picks four points that span a tetrahedron to start the hull from
+    Returns:
+        list of the four vertex indices
+    Raises:
+        ValueError if all the points lie on one plane
+    """
+    a = 0
+    b = next((i for i, v in enumerate(vertices) if v != vertices[a]), None)
+    if b is None:
+        raise ValueError("need at least 4 distinct points for a spherical diagram")
+    va, vb = np.asarray(vertices[a]), np.asarray(vertices[b])
+    normal = np.cross(vb - va, np.asarray(vertices) - va)
+    c = int(np.argmax((normal * normal).sum(axis=1)))
+    d = max(
+        range(len(vertices)),
+        key=lambda i: abs(orient3d(vertices[a], vertices[b], vertices[c], vertices[i])),
+    )
+    if orient3d(vertices[a], vertices[b], vertices[c], vertices[d]) == 0:
+        raise ValueError("points are coplanar, e.g. all on one great circle")
+    return [a, b, c, d]
+
+
+def spherical_delaunay(points):
+    """
+    Finds the Delaunay triangulation of lon/lat points on the sphere
+    Arguments:
+        points: a list of (lon, lat) tuples in degrees
+    Returns:
+        vertices: list of x, y, z unit vector tuples, one per point
+        faces: list of [a, b, c] vertex indices, counter-clockwise seen from
+               outside the sphere
+        neighbors: neighbors[f][i] is the face across the edge opposite
+                   vertex i of face f
+    Raises:
+        ValueError if there are fewer than 4 distinct points or they all lie
+        on one plane
+    """
+    unit = to_unit_vectors(points)
+    # points that only differ in floating point as unit vectors, such as a
+    # pole at several longitudes or lon -180 and 180, are one point on the
+    # sphere, give them the same vector so insertion drops the repeats
+    _, first, inverse = np.unique(
+        np.round(unit, 12), axis=0, return_index=True, return_inverse=True
+    )
+    unit = unit[first[inverse.ravel()]]
+    vertices = [tuple(v) for v in unit.tolist()]
+    tetrahedron = _initial_tetrahedron(vertices)
+
+    faces = []
+    for skip in range(4):
+        a, b, c = (v for i, v in enumerate(tetrahedron) if i != skip)
+        # the fourth vertex must be behind the face for it to point outward
+        if (
+            orient3d(vertices[a], vertices[b], vertices[c], vertices[tetrahedron[skip]])
+            > 0
+        ):
+            b, c = c, b
+        faces.append([a, b, c])
+    edges = {}
+    for f, face in enumerate(faces):
+        for i in range(3):
+            edges[(face[(i + 1) % 3], face[(i + 2) % 3])] = (f, i)
+    neighbors = [[-1, -1, -1] for _ in faces]
+    for (a, b), (f, i) in edges.items():
+        neighbors[f][i] = edges[(b, a)][0]
+
+    # the walk locates points by the cones from a point inside the hull over
+    # its faces, the first face whose cone holds a new point is visible from it
+    center = tuple(np.mean([vertices[i] for i in tetrahedron], axis=0).tolist())
+
+    def orient(a, b, p):
+        return orient3d(center, a, b, p)
+
+    last = 0
+    seeded = set(tetrahedron)
+    for p in hilbert_order(points):
+        if p in seeded:
+            continue
+        new_faces = _insert_point(
+            vertices,
+            faces,
+            neighbors,
+            p,
+            last,
+            orient=orient,
+            in_circle=orient3d,
+        )
+        if new_faces:
+            last = new_faces[-1]
+    return vertices, faces, neighbors
+
+
+def spherical_voronoi(points, properties=None, clockwise=True):
+    """
+    Finds the Voronoi diagram of lon/lat points on the sphere
+    Arguments:
+        points: a list of (lon, lat) tuples in degrees
+        properties: (opt.) list of dicts, one per point, copied into the
+                    properties of each cell, default None
+        clockwise: (opt.) wind the rings clockwise as d3-geo expects, False
+                   gives the counter-clockwise rings of RFC 7946, default True
+    Returns:
+        a GeoJSON FeatureCollection dict with one Polygon feature per point,
+        points coinciding with an earlier point get no feature
+    """
+    vertices, faces, neighbors = spherical_delaunay(points)
+    v = np.asarray(vertices)
+    f = np.asarray(faces)
+    # the circumcenter of a face on the sphere is its outward normal
+    centers = to_lonlat(
+        np.cross(v[f[:, 1]] - v[f[:, 0]], v[f[:, 2]] - v[f[:, 0]])
+    ).tolist()
+
+    vertex_face = [-1] * len(vertices)
+    for i, face in enumerate(faces):
+        for u in face:
+            vertex_face[u] = i
+
+    features = []
+    for site, start in enumerate(vertex_face):
+        if start == -1:
+            continue
+        ring = []
+        face = start
+        while True:
+            ring.append(centers[face])
+            i = faces[face].index(site)
+            face = neighbors[face][(i + 1) % 3]
+            if face == start:
+                break
+        if clockwise:
+            ring.reverse()
+        ring.append(ring[0])
+        lon, lat = points[site][0], points[site][1]
+        feature_properties = dict(properties[site]) if properties else {}
+        feature_properties.update({"site": [lon, lat], "index": site})
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": feature_properties,
+            }
+        )
+    return {"type": "FeatureCollection", "features": features}
@@ -5,10 +5,18 @@ Description:    implementation of the Bowyer-Watson algorithm to create a
                 edges of the Voronoi diagram
 """
 
-import math, json
+import math
+
+import numpy as np
+
+from predicates import orient, in_circle_perturbed, circumcenter, circumcenter_batch
+from point_location import PointLocator
+from voronoi_output import VoronoiDiagram
 
 
 class Edge:
+    __slots__ = ("p1", "p2")
+
     def __init__(self, p1, p2):
         if p1[0] < p2[0] or (p1[0] == p2[0] and p1[1] <= p2[1]):
             self.p1 = p1
@@ -16,20 +24,28 @@ class Edge:
         else:
             self.p1 = p2
             self.p2 = p1
-        self.midpoint = (
+
+    @property
+    def midpoint(self):
+        return (
             (self.p1[0] + self.p2[0]) / 2.0,
             (self.p1[1] + self.p2[1]) / 2.0,
         )
+
+    @property
+    def slope(self):
         if self.p1[0] - self.p2[0] == 0:
-            self.slope = None
-        else:
-            self.slope = (self.p1[1] - self.p2[1]) / (self.p1[0] - self.p2[0])
-        if self.slope is None:
-            self.perp_slope = 0
-        elif self.slope == 0:
-            self.perp_slope = None
-        else:
-            self.perp_slope = -1.0 / self.slope
+            return None
+        return (self.p1[1] - self.p2[1]) / (self.p1[0] - self.p2[0])
+
+    @property
+    def perp_slope(self):
+        slope = self.slope
+        if slope is None:
+            return 0
+        elif slope == 0:
+            return None
+        return -1.0 / slope
 
     def __eq__(self, other_edge):
         if not isinstance(other_edge, Edge):
@@ -41,16 +57,24 @@ class Edge:
 
 
 class Triangle:
-    def __init__(self, p1, p2, p3):
+    __slots__ = ("p1", "p2", "p3", "circumcenter", "_edges")
+
+    def __init__(self, p1, p2, p3, circumcenter=None):
         self.p1 = p1
         self.p2 = p2
         self.p3 = p3
-        self.edges = [
-            Edge(self.p1, self.p2),
-            Edge(self.p1, self.p3),
-            Edge(self.p2, self.p3),
-        ]
-        self.circumcenter = None
+        self.circumcenter = circumcenter
+        self._edges = None
+
+    @property
+    def edges(self):
+        if self._edges is None:
+            self._edges = [
+                Edge(self.p1, self.p2),
+                Edge(self.p1, self.p3),
+                Edge(self.p2, self.p3),
+            ]
+        return self._edges
 
     def __eq__(self, other_triangle):
         if not isinstance(other_triangle, Triangle):
@@ -70,47 +94,11 @@ class Triangle:
         Voronoi diagram
         Returns:
             the circumcenter of this triangle
+        Raises:
+            ValueError if the triangle is degenerate (collinear vertices)
         """
-        # find midpoints of two lines:
-        if self.circumcenter != None:
-            return self.circumcenter
-        midpoint1 = self.edges[0].midpoint
-        midpoint2 = self.edges[1].midpoint
-        # find slopes of same two lines and perpendicular lines
-        perp_slope1 = self.edges[0].perp_slope
-        perp_slope2 = self.edges[1].perp_slope
-        # calculate x, y where the perpendicular bisectors intersect:
-        if perp_slope1 is None:
-            x = midpoint1[0]
-            b = midpoint2[1] - (perp_slope2 * midpoint2[0])
-            y = (perp_slope2 * x) + b
-        elif perp_slope2 is None:
-            x = midpoint2[0]
-            b = midpoint1[1] - (perp_slope1 * midpoint1[0])
-            y = (perp_slope1 * x) + b
-        elif perp_slope1 == 0:
-            y = midpoint1[1]
-            b = midpoint2[1] - (midpoint2[0] * perp_slope2)
-            x = (y - b) / perp_slope2
-        elif perp_slope2 == 0:
-            y = midpoint2[1]
-            b = midpoint1[1] - (midpoint1[0] * perp_slope1)
-            x = (y - b) / perp_slope1
-        else:
-            if perp_slope1 - perp_slope2 == 0:
-                # TODO: figure out how to handle this error
-                print(
-                    "Error: perpendicular bisectors are parallel, can't find circumcenter"
-                )
-                exit(1)
-            x = (
-                (perp_slope1 * midpoint1[0])
-                - midpoint1[1]
-                - (perp_slope2 * midpoint2[0])
-                + midpoint2[1]
-            ) / (perp_slope1 - perp_slope2)
-            y = (perp_slope1 * (x - midpoint1[0])) + midpoint1[1]
-        self.circumcenter = (x, y)
+        if self.circumcenter is None:
+            self.circumcenter = circumcenter(self.p1, self.p2, self.p3)
         return self.circumcenter
 
     def find_circumcircle(self):
@@ -128,6 +116,8 @@ class Triangle:
 
 
 class Circle:
+    __slots__ = ("center", "radius")
+
     def __init__(self, center, radius):
         self.center = center
         self.radius = radius
@@ -153,63 +143,452 @@ def find_supertriangle(points):
     return Triangle((mid_x - d, mid_y - d), (mid_x, mid_y + d), (mid_x + d, mid_y - d))
 
 
-def bowyer_watson(points):
+def _hilbert_index(x, y, order):
+    """
+    Position of the integer grid cell x, y along a Hilbert curve covering a
+    2^order by 2^order grid
+    """
+    side = 1 << order
+    d = 0
+    s = side >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = side - 1 - x
+                y = side - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def hilbert_order(points, order=16):
+    """
+    Sorts the points along a Hilbert curve so that consecutive points are
+    spatially close, which keeps the point location walk in bowyer_watson short
+    Arguments:
+        points: a list of tuples representing x, y coordinates
+        order: number of bits per axis used to quantize the coordinates
+    Returns:
+        a list of indices into points in Hilbert curve order
+    """
+    min_x = min(p[0] for p in points)
+    max_x = max(p[0] for p in points)
+    min_y = min(p[1] for p in points)
+    max_y = max(p[1] for p in points)
+    scale = ((1 << order) - 1) / (max(max_x - min_x, max_y - min_y) or 1.0)
+    keys = [
+        _hilbert_index(int((p[0] - min_x) * scale), int((p[1] - min_y) * scale), order)
+        for p in points
+    ]
+    return sorted(range(len(points)), key=keys.__getitem__)
+
+
+def _locate(vertices, tri_vertices, tri_neighbors, start, point, orient=orient):
+    """
+    Finds the triangle containing point by walking across the triangulation
+    from the start triangle, always stepping over an edge that separates the
+    current triangle from the point
+    Arguments:
+        orient: (opt.) the orientation predicate of the surface being
+                triangulated, default the planar predicates.orient
+    Returns:
+        the index of the triangle containing point
+    """
+    t = start
+    while True:
+        v = tri_vertices[t]
+        for i in range(3):
+            if orient(vertices[v[(i + 1) % 3]], vertices[v[(i + 2) % 3]], point) < 0:
+                neighbor = tri_neighbors[t][i]
+                if neighbor != -1:
+                    t = neighbor
+                    break
+        else:
+            return t
+
+
+def _insert_point(
+    vertices,
+    tri_vertices,
+    tri_neighbors,
+    p,
+    start,
+    free=None,
+    orient=orient,
+    in_circle=in_circle_perturbed,
+):
+    """
+    Inserts vertex p into the triangulation: locates it by walking from the
+    start triangle, flood fills the cavity of triangles whose circumcircle
+    holds it and connects the cavity boundary to it. Slots of removed
+    triangles are reused first, then slots from free, before the lists grow
+    Arguments:
+        vertices: list of x, y tuples, p indexes into it
+        tri_vertices, tri_neighbors: the triangulation, updated in place
+        p: index of the vertex to insert
+        start: index of the triangle to start the point location walk from
+        free: (opt.) list of unused triangle slots, default None
+        orient, in_circle: (opt.) predicates of the surface being
+                           triangulated, default the planar ones with
+                           cocircular ties broken by in_circle_perturbed
+    Returns:
+        the indices of the new triangles, or None if p coincides with a
+        vertex already in the triangulation
+    """
+    point = vertices[p]
+    start = _locate(vertices, tri_vertices, tri_neighbors, start, point, orient)
+    a, b, c = tri_vertices[start]
+    if in_circle(vertices[a], vertices[b], vertices[c], point) <= 0:
+        return None  # duplicate point, already a vertex of the triangulation
+
+    # flood fill the cavity of triangles whose circumcircle holds the point
+    bad = {start: True}
+    stack = [start]
+    boundary = []
+    while stack:
+        t = stack.pop()
+        v = tri_vertices[t]
+        for i in range(3):
+            other = tri_neighbors[t][i]
+            if other != -1 and other not in bad:
+                a, b, c = tri_vertices[other]
+                bad[other] = in_circle(vertices[a], vertices[b], vertices[c], point) > 0
+                if bad[other]:
+                    stack.append(other)
+            if other == -1 or not bad[other]:
+                boundary.append((v[(i + 1) % 3], v[(i + 2) % 3], other))
+
+    # re-triangulate the cavity by connecting its boundary to the point,
+    # reusing the slots of the removed triangles
+    cavity = [t for t, is_bad in bad.items() if is_bad]
+    new_triangles = []
+    starts_at = {}
+    ends_at = {}
+    for a, b, other in boundary:
+        if cavity:
+            t = cavity.pop()
+            tri_vertices[t] = [p, a, b]
+            tri_neighbors[t] = [other, -1, -1]
+        elif free:
+            t = free.pop()
+            tri_vertices[t] = [p, a, b]
+            tri_neighbors[t] = [other, -1, -1]
+        else:
+            t = len(tri_vertices)
+            tri_vertices.append([p, a, b])
+            tri_neighbors.append([other, -1, -1])
+        if other != -1:
+            _link(tri_vertices, tri_neighbors, other, a, b, t)
+        starts_at[a] = t
+        ends_at[b] = t
+        new_triangles.append(t)
+    for a, b, other in boundary:
+        t = starts_at[a]
+        tri_neighbors[t][1] = starts_at[b]
+        tri_neighbors[t][2] = ends_at[a]
+    return new_triangles
+
+
+def _link(tri_vertices, tri_neighbors, t, a, b, neighbor):
+    """
+    Points the edge a, b of triangle t at neighbor
+    """
+    v = tri_vertices[t]
+    for j in range(3):
+        if v[j] != a and v[j] != b:
+            tri_neighbors[t][j] = neighbor
+
+
+def _triangulate(points, supertriangle=None):
+    """
+    Builds the Delaunay triangulation of points, including the triangles
+    attached to the supertriangle. Triangles are stored as index lists with
+    counter-clockwise vertices, and tri_neighbors[t][i] is the triangle across
+    the edge opposite vertex i of triangle t (-1 if there is none)
+    Arguments:
+        points: a list of tuples representing x, y coordinates
+        supertriangle: (opt.) Triangle surrounding the points, default None
+                       meaning the one from find_supertriangle
+    Returns:
+        vertices: points followed by the three supertriangle vertices
+        tri_vertices: list of [a, b, c] vertex indices per triangle
+        tri_neighbors: list of [n0, n1, n2] triangle indices per triangle
+    """
+    if supertriangle is None:
+        supertriangle = find_supertriangle(points)
+    n = len(points)
+    vertices = list(points) + [supertriangle.p1, supertriangle.p2, supertriangle.p3]
+    if orient(*vertices[n:]) > 0:
+        tri_vertices = [[n, n + 1, n + 2]]
+    else:
+        tri_vertices = [[n, n + 2, n + 1]]
+    tri_neighbors = [[-1, -1, -1]]
+    last = 0
+
+    for p in hilbert_order(points):
+        new_triangles = _insert_point(vertices, tri_vertices, tri_neighbors, p, last)
+        if new_triangles:
+            last = new_triangles[-1]
+
+    return vertices, tri_vertices, tri_neighbors
+
+
+class TriangleMesh:
+    """
+    Compact Delaunay triangulation backed by NumPy arrays. vertices holds the
+    x, y coordinates, triangles holds the counter-clockwise vertex indices of
+    each triangle and neighbors[t][i] is the triangle across the edge opposite
+    vertex i of triangle t (-1 on the convex hull). Iterating over the mesh
+    yields Triangle views so it can be used wherever a list of triangles is
+    expected.
+    """
+
+    __slots__ = ("vertices", "triangles", "neighbors", "_circumcenters", "_locator")
+
+    def __init__(self, vertices, triangles, neighbors):
+        self.vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        self.triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        self.neighbors = np.asarray(neighbors, dtype=np.int32).reshape(-1, 3)
+        self._circumcenters = None
+        self._locator = None
+
+    @classmethod
+    def from_points(cls, points, workers=None):
+        """
+        Triangulates points with the Bowyer-Watson algorithm
+        Arguments:
+            points: a list of tuples representing x, y coordinates
+            workers: (opt.) number of processes to triangulate with, see
+                     parallel_delaunay, default None meaning serial
+        Returns:
+            a TriangleMesh of the Delaunay triangulation, without the
+            triangles attached to the supertriangle
+        """
+        n = len(points)
+        if workers is not None and workers > 1:
+            from parallel_delaunay import triangulate_parallel
+
+            vertices, triangles, neighbors = triangulate_parallel(points, workers)
+        else:
+            vertices, tri_vertices, tri_neighbors = _triangulate(points)
+            triangles = np.array(tri_vertices, dtype=np.int32).reshape(-1, 3)
+            neighbors = np.array(tri_neighbors, dtype=np.int32).reshape(-1, 3)
+        keep = (triangles < n).all(axis=1)
+        new_index = np.cumsum(keep, dtype=np.int32) - 1
+        neighbors = neighbors[keep]
+        valid = neighbors != -1
+        valid[valid] = keep[neighbors[valid]]
+        neighbors = np.where(valid, new_index[neighbors], -1)
+        return cls(vertices[:n], triangles[keep], neighbors)
+
+    @property
+    def circumcenters(self):
+        """
+        Circumcenters of every triangle as a (len(self), 2) array, computed on
+        first access
+        """
+        if self._circumcenters is None:
+            self._circumcenters = circumcenter_batch(
+                self.vertices[self.triangles[:, 0]],
+                self.vertices[self.triangles[:, 1]],
+                self.vertices[self.triangles[:, 2]],
+            )
+        return self._circumcenters
+
+    @property
+    def nbytes(self):
+        total = self.vertices.nbytes + self.triangles.nbytes + self.neighbors.nbytes
+        if self._circumcenters is not None:
+            total += self._circumcenters.nbytes
+        return total
+
+    @property
+    def locator(self):
+        """
+        PointLocator query index over this mesh, built on first access
+        """
+        if self._locator is None:
+            self._locator = PointLocator(self.vertices, self.triangles, self.neighbors)
+        return self._locator
+
+    def locate(self, points):
+        """
+        Finds the triangle containing each point
+        Arguments:
+            points: a single (x, y) or an (n, 2) array of query points
+        Returns:
+            the index of the containing triangle, -1 outside the convex hull,
+            an (n,) array for a batch
+        """
+        return self.locator.locate(points)
+
+    def nearest_site(self, points):
+        """
+        Finds the site closest to each point, i.e. the Voronoi cell holding it
+        Arguments:
+            points: a single (x, y) or an (n, 2) array of query points
+        Returns:
+            the index into vertices of the nearest site, an (n,) array for a
+            batch
+        """
+        return self.locator.nearest_site(points)
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def __getitem__(self, index):
+        a, b, c = self.triangles[index].tolist()
+        return Triangle(
+            tuple(self.vertices[a].tolist()),
+            tuple(self.vertices[b].tolist()),
+            tuple(self.vertices[c].tolist()),
+            circumcenter=tuple(self.circumcenters[index].tolist()),
+        )
+
+    def __iter__(self):
+        vertices = [tuple(v) for v in self.vertices.tolist()]
+        circumcenters = self.circumcenters.tolist()
+        for (a, b, c), center in zip(self.triangles.tolist(), circumcenters):
+            yield Triangle(vertices[a], vertices[b], vertices[c], tuple(center))
+
+
+def bowyer_watson(points, workers=None):
     """
     Finds the Delaunay triangulation for a given set of points using the
-    Bowyer-Watson algorithm
+    Bowyer-Watson algorithm. Points are inserted in Hilbert curve order, each
+    one is located by walking from the previous insertion and the triangles
+    it invalidates are found by flood filling through triangle adjacency
     Arguments:
         points: a list of tuples representing x, y coordinates
+        workers: (opt.) number of processes for large inputs, default None
+                 meaning serial
     Returns:
         triangulation: a list of triangles that form the
                        Delaunay triangulation
     """
-    supertriangle = find_supertriangle(points)
-    triangulation = [supertriangle]
-    for point in points:
-        bad_triangles = []
-        for triangle in triangulation:
-            circumcircle = triangle.find_circumcircle()
-            center = circumcircle.center
-            dist = math.sqrt(
-                math.pow(center[0] - point[0], 2) + math.pow(center[1] - point[1], 2)
-            )
-            if dist < circumcircle.radius:  # <= ?
-                bad_triangles.append(triangle)
-
-        polygon = []
-        to_remove = []
-        for triangle in bad_triangles:
-            for edge in triangle.edges:
-                if edge in polygon:
-                    to_remove.append(edge)
-                else:
-                    polygon.append(edge)
-
-        for edge in to_remove:
-            if edge in polygon:
-                polygon.remove(edge)
-
-        for triangle in bad_triangles:
-            triangulation.remove(triangle)
-        for edge in polygon:
-            triangulation.append(Triangle(point, edge.p1, edge.p2))
-
-    triangulation = [
-        t
-        for t in triangulation
-        if t.p1 not in [supertriangle.p1, supertriangle.p2, supertriangle.p3]
-        and t.p2 not in [supertriangle.p1, supertriangle.p2, supertriangle.p3]
-        and t.p3 not in [supertriangle.p1, supertriangle.p2, supertriangle.p3]
+    return list(TriangleMesh.from_points(points, workers=workers))
+
+
+def _clip_polygon(polygon, min_x, min_y, max_x, max_y):
+    """
+    Clips a convex polygon to an axis aligned box (Sutherland-Hodgman)
+    Arguments:
+        polygon: list of tuples representing the polygon's vertices in order
+        min_x, min_y, max_x, max_y: the clipping box
+    Returns:
+        the vertices of the clipped polygon, empty if it lies outside the box
+    """
+    planes = [
+        (lambda p: p[0] >= min_x, lambda p, q: (min_x, _lerp_y(p, q, min_x))),
+        (lambda p: p[0] <= max_x, lambda p, q: (max_x, _lerp_y(p, q, max_x))),
+        (lambda p: p[1] >= min_y, lambda p, q: (_lerp_x(p, q, min_y), min_y)),
+        (lambda p: p[1] <= max_y, lambda p, q: (_lerp_x(p, q, max_y), max_y)),
     ]
+    for inside, intersect in planes:
+        clipped = []
+        for i, q in enumerate(polygon):
+            p = polygon[i - 1]
+            if inside(q):
+                if not inside(p):
+                    clipped.append(intersect(p, q))
+                clipped.append(q)
+            elif inside(p):
+                clipped.append(intersect(p, q))
+        polygon = clipped
+        if not polygon:
+            break
+    return polygon
+
+
+def _walk_fan(fan):
+    """
+    Orders the triangles around a site counterclockwise
+    Arguments:
+        fan: dict of neighbor -> (circumcenter, next neighbor) for every
+             counterclockwise triangle (site, neighbor, next neighbor)
+    Returns:
+        the circumcenters and the neighbors in counterclockwise order. A hull
+        site has one more neighbor than circumcenters, the first and last
+        neighbor being the ends of its two hull edges
+    """
+    # a hull site's fan starts at the neighbor no triangle leads to
+    start = next(iter(fan.keys() - {r for _, r in fan.values()}), None)
+    closed = start is None
+    if closed:
+        start = next(iter(fan))
+    circumcenters, neighbors = [], [start]
+    q = start
+    while q in fan:
+        c, q = fan[q]
+        circumcenters.append(c)
+        if q == start:
+            break
+        neighbors.append(q)
+    return circumcenters, neighbors
+
+
+def _clip_bisector(polygon, site, neighbor):
+    """
+    Clips a convex polygon to the half plane closer to site than to neighbor
+    Arguments:
+        polygon: list of tuples representing the polygon's vertices in order
+        site, neighbor: the two points whose bisector bounds the half plane
+    Returns:
+        the vertices of the clipped polygon, empty if nothing is left
+    """
+    nx, ny = neighbor[0] - site[0], neighbor[1] - site[1]
+    mx, my = (site[0] + neighbor[0]) / 2, (site[1] + neighbor[1]) / 2
+    side = [(x - mx) * nx + (y - my) * ny for x, y in polygon]
+    clipped = []
+    for i, q in enumerate(polygon):
+        p, sp, sq = polygon[i - 1], side[i - 1], side[i]
+        if sp * sq < 0:
+            t = sp / (sp - sq)
+            clipped.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+        if sq <= 0:
+            clipped.append(q)
+    return clipped
 
-    return triangulation
 
+def _lerp_y(p, q, x):
+    return p[1] + (q[1] - p[1]) * (x - p[0]) / (q[0] - p[0])
 
-def voronoi_from_triangulation(triangulation, min_x, min_y, max_x, max_y):
+
+def _lerp_x(p, q, y):
+    return p[0] + (q[0] - p[0]) * (y - p[1]) / (q[1] - p[1])
+
+
+def _ray_to_box(origin, direction, min_x, min_y, max_x, max_y):
+    """
+    Finds where a ray leaves the box
+    Returns:
+        the exit point, or None if the ray never passes through the box
+    """
+    t = math.inf
+    if direction[0] > 0:
+        t = min(t, (max_x - origin[0]) / direction[0])
+    elif direction[0] < 0:
+        t = min(t, (min_x - origin[0]) / direction[0])
+    if direction[1] > 0:
+        t = min(t, (max_y - origin[1]) / direction[1])
+    elif direction[1] < 0:
+        t = min(t, (min_y - origin[1]) / direction[1])
+    if t <= 0 or t == math.inf:
+        return None
+    return (origin[0] + t * direction[0], origin[1] + t * direction[1])
+
+
+def voronoi_from_triangulation(
+    triangulation, min_x, min_y, max_x, max_y, output="json", sink=None
+):
     """
     Given the Delaunay triangulation of a set of points, create the Voronoi
     diagram formed by the circumcenters and create a JSON object representing
-    the edges of the Voronoi diagram
+    the edges of the Voronoi diagram and the cell around every site. Each
+    Delaunay edge is visited once through an edge to incident triangles map
     Arguments:
         triangulation: a list of triangles that form the
                        Delaunay triangulation
@@ -217,100 +596,83 @@ def voronoi_from_triangulation(triangulation, min_x, min_y, max_x, max_y):
         min_y: minimum y coordinate the "infinite edges" can extend out to
         max_x: maximum x coordinate the "infinite edges" can extend out to
         max_y: maximum y coordinate the "infinite edges" can extend out to
+        output: (opt.) "json" for a JSON string, "diagram" for a
+                VoronoiDiagram of NumPy arrays, "geojson" or "binary" to
+                write to sink, default "json"
+        sink: (opt.) file-like object written to when output is "geojson"
+              (text) or "binary" (bytes), default None
     Returns:
-        JSON object representing a Voronoi diagram
+        JSON object representing a Voronoi diagram, with "edges" holding each
+        Voronoi edge once and "cells" holding the closed polygon of each site
+        clipped to the min_x, min_y, max_x, max_y box. A VoronoiDiagram when
+        output is "diagram", None when writing to sink
     """
+    if output not in ("json", "diagram", "geojson", "binary"):
+        raise ValueError(f"unknown output {output!r}")
+    if output in ("geojson", "binary") and sink is None:
+        raise ValueError(f"output {output!r} needs a sink to write to")
+
+    edge_triangles = {}
+    fans = {}
+    for tri in triangulation:
+        c = tri.find_circumcenter()
+        p1, p2, p3 = tri.p1, tri.p2, tri.p3
+        if orient(p1, p2, p3) < 0:
+            p2, p3 = p3, p2
+        for p, q, r in ((p1, p2, p3), (p2, p3, p1), (p3, p1, p2)):
+            key = (p, q) if p <= q else (q, p)
+            edge_triangles.setdefault(key, []).append((c, r))
+            # (p, q, r) is counterclockwise, so r follows q around p
+            fans.setdefault(p, {})[q] = (c, r)
+
     voronoi_edges = []
-    ch_circumcenters = {}
-    ch_vertices = []
-    for tri1 in triangulation:
-        c1 = tri1.find_circumcenter()
-        for edge in tri1.edges:
-            edge_found = False
-            for tri2 in triangulation:
-                if tri1 == tri2:
-                    continue
-                if edge in tri2.edges:
-                    # edge is part of two different triangles in triangulation
-                    c2 = tri2.find_circumcenter()
-                    voronoi_edges.append(Edge(c1, c2))
-                    edge_found = True
-            if not edge_found:
-                # edge is an edge of the entire polygon, extend "infinitely"
-                other_edges = [e for e in tri1.edges if e != edge]
-                # find point in triangle that isn't one of edge's points
-                if other_edges[0].p1 == edge.p1:
-                    vertex = other_edges[0].p2
-                else:
-                    vertex = other_edges[0].p1
-
-                if edge.perp_slope is None:
-                    # check whether c1 is above or below other vertex
-                    if edge.midpoint[1] < vertex[1]:
-                        # draw line down
-                        voronoi_edges.append(Edge(c1, (c1[0], min_y)))
-                    else:
-                        # draw line up
-                        voronoi_edges.append(Edge(c1, (c1[0], max_y)))
-                elif edge.perp_slope == 0:
-                    # check whether c1 is to the left or right of other vertex
-                    if edge.midpoint[0] < vertex[0]:
-                        # draw line left
-                        voronoi_edges.append(Edge(c1, (min_x, c1[1])))
-                    else:
-                        # draw line right
-                        voronoi_edges.append(Edge(c1, (max_x, c1[1])))
-                else:
-                    ch_circumcenters[c1] = edge
-
-    for edge in ch_circumcenters.values():
-        ch_vertices.append(edge.p1)
-        ch_vertices.append(edge.p2)
-
-    ch_vertices = list(set(ch_vertices))  # remove duplicates
-    if len(ch_vertices) > 0:
-        x_mid = (
-            min([point[0] for point in ch_vertices])
-            + max([point[0] for point in ch_vertices])
-        ) / 2.0
-        y_mid = (
-            min([point[1] for point in ch_vertices])
-            + max([point[1] for point in ch_vertices])
-        ) / 2.0
-
-    for c, edge in ch_circumcenters.items():
-        if abs(edge.slope) < 1:  # treat as horizontal
-            b = edge.midpoint[1] - (edge.slope * edge.midpoint[0])
-            y = (edge.slope * x_mid) + b
-            if y < y_mid:  # draw line down
-                y = min_y
-                b = edge.midpoint[1] - (edge.perp_slope * edge.midpoint[0])
-                x = (y - b) / edge.perp_slope
-                voronoi_edges.append(Edge(c, (x, y)))
-            else:  # draw line up
-                y = max_y
-                b = edge.midpoint[1] - (edge.perp_slope * edge.midpoint[0])
-                x = (y - b) / edge.perp_slope
-                voronoi_edges.append(Edge(c, (x, y)))
-        else:  # treat as vertical
-            b = edge.midpoint[1] - (edge.slope * edge.midpoint[0])
-            x = (y_mid - b) / edge.slope
-            if x < x_mid:  # draw line left
-                x = min_x
-                b = edge.midpoint[1] - (edge.perp_slope * edge.midpoint[0])
-                y = (edge.perp_slope * x) + b
-                voronoi_edges.append(Edge(c, (x, y)))
-            else:  # draw line right
-                x = max_x
-                b = edge.midpoint[1] - (edge.perp_slope * edge.midpoint[0])
-                y = (edge.perp_slope * x) + b
-                voronoi_edges.append(Edge(c, (x, y)))
-
-    # convert edges to dicts of p1, p2
-    edge_dicts = []
-    for edge in voronoi_edges:
-        edge_dicts.append(
-            {"x1": edge.p1[0], "y1": edge.p1[1], "x2": edge.p2[0], "y2": edge.p2[1]}
-        )
-    voronoi_obj = json.dumps({"edges": edge_dicts})
-    return voronoi_obj
+    for (p, q), tris in edge_triangles.items():
+        if len(tris) == 2:
+            # edge is part of two different triangles in triangulation
+            (c1, _), (c2, _) = tris
+            if c1 != c2:
+                voronoi_edges.append((c1, c2))
+            continue
+        # edge is an edge of the entire polygon, extend "infinitely" away
+        # from the third vertex of its triangle
+        c, r = tris[0]
+        normal = (q[1] - p[1], p[0] - q[0])
+        if normal[0] * (r[0] - p[0]) + normal[1] * (r[1] - p[1]) > 0:
+            normal = (-normal[0], -normal[1])
+        end = _ray_to_box(c, normal, min_x, min_y, max_x, max_y)
+        if end is not None:
+            voronoi_edges.append((c, end))
+
+    box = [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)]
+    cells = []
+    for site, fan in fans.items():
+        circumcenters, neighbors = _walk_fan(fan)
+        if len(neighbors) == len(circumcenters):
+            # closed fan, the circumcenters already go around the site
+            # cocircular sites repeat a circumcenter
+            polygon = [
+                c for i, c in enumerate(circumcenters) if c != circumcenters[i - 1]
+            ]
+            polygon = _clip_polygon(
+                polygon or circumcenters, min_x, min_y, max_x, max_y
+            )
+        else:
+            # open fan of a hull site, its first and last neighbors share the
+            # two hull edges whose bisectors carry the unbounded rays
+            polygon = box
+            for neighbor in neighbors:
+                polygon = _clip_bisector(polygon, site, neighbor)
+                if not polygon:
+                    break
+        if polygon:
+            polygon.append(polygon[0])
+            cells.append((site, polygon))
+
+    diagram = VoronoiDiagram.from_lists(voronoi_edges, cells)
+    if output == "diagram":
+        return diagram
+    if output == "geojson":
+        return diagram.write_geojson(sink)
+    if output == "binary":
+        return diagram.write_binary(sink)
+    return diagram.to_json()
@@ -0,0 +1,216 @@
+"""
+File:   voronoi_output.py
+Description:    in-memory result of voronoi_from_triangulation and the sinks it
+                can be written to: the original JSON string, GeoJSON streamed
+                feature by feature, and a compact binary layout of float32
+                buffers behind a small index header that can be memory-mapped
+                or sent without copying
+"""
+
+import json
+import struct
+
+import numpy as np
+
+BINARY_MAGIC = b"VORO"
+BINARY_VERSION = 1
+# magic, version, number of edges, number of cells, number of cell vertices
+_HEADER = struct.Struct("<4sIIII")
+
+
+class VoronoiDiagram:
+    """
+    Voronoi diagram held in flat NumPy arrays. edges is (n_edges, 4) with one
+    x1, y1, x2, y2 row per Voronoi edge, sites is (n_cells, 2) and the
+    polygon of cell i is cell_vertices[cell_offsets[i]:cell_offsets[i + 1]],
+    closed so its first and last vertex are equal.
+    """
+
+    __slots__ = ("edges", "sites", "cell_offsets", "cell_vertices")
+
+    def __init__(self, edges, sites, cell_offsets, cell_vertices):
+        self.edges = np.asarray(edges).reshape(-1, 4)
+        self.sites = np.asarray(sites).reshape(-1, 2)
+        self.cell_offsets = np.asarray(cell_offsets).reshape(-1)
+        self.cell_vertices = np.asarray(cell_vertices).reshape(-1, 2)
+
+    @classmethod
+    def from_lists(cls, edges, cells):
+        """
+        Arguments:
+            edges: list of ((x1, y1), (x2, y2)) Voronoi edges
+            cells: list of (site, polygon) pairs, polygon being a closed list
+                   of x, y tuples
+        Returns:
+            a VoronoiDiagram holding the same data
+        """
+        offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(polygon) for _, polygon in cells])
+        return cls(
+            np.array(edges, dtype=np.float64).reshape(-1, 4),
+            np.array([site for site, _ in cells], dtype=np.float64).reshape(-1, 2),
+            offsets,
+            np.array(
+                [v for _, polygon in cells for v in polygon], dtype=np.float64
+            ).reshape(-1, 2),
+        )
+
+    def __len__(self):
+        return len(self.sites)
+
+    def cell(self, index):
+        """
+        Returns:
+            view of the closed polygon of cell index as an (n, 2) array
+        """
+        return self.cell_vertices[
+            self.cell_offsets[index] : self.cell_offsets[index + 1]
+        ]
+
+    def to_dict(self):
+        """
+        Returns:
+            dict with "edges" as x1, y1, x2, y2 dicts and "cells" as site and
+            polygon lists, the layout voronoi_from_triangulation has always
+            returned as JSON
+        """
+        edges = [
+            {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+            for x1, y1, x2, y2 in self.edges.tolist()
+        ]
+        vertices = self.cell_vertices.tolist()
+        offsets = self.cell_offsets.tolist()
+        cells = [
+            {"site": site, "polygon": vertices[offsets[i] : offsets[i + 1]]}
+            for i, site in enumerate(self.sites.tolist())
+        ]
+        return {"edges": edges, "cells": cells}
+
+    def to_json(self):
+        """
+        Returns:
+            the diagram as a JSON string
+        """
+        return json.dumps(self.to_dict())
+
+    def write_geojson(self, fp, chunk_size=1024):
+        """
+        Streams the diagram as a GeoJSON FeatureCollection, with one Polygon
+        feature per cell and one LineString feature per edge. Features are
+        written in chunks so the whole document is never held in memory.
+        Arguments:
+            fp: text file-like object to write to
+            chunk_size: (opt.) number of features per write, default 1024
+        Returns:
+            None
+        """
+        fp.write('{"type": "FeatureCollection", "features": [')
+        first = True
+        for chunk in _chunks(self._features(), chunk_size):
+            fp.write(("" if first else ",") + ",".join(chunk))
+            first = False
+        fp.write("]}")
+
+    def _features(self):
+        offsets = self.cell_offsets.tolist()
+        for i, site in enumerate(self.sites.tolist()):
+            ring = self.cell_vertices[offsets[i] : offsets[i + 1]].tolist()
+            yield json.dumps(
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Polygon", "coordinates": [ring]},
+                    "properties": {"kind": "cell", "site": site},
+                }
+            )
+        for x1, y1, x2, y2 in self.edges.tolist():
+            yield json.dumps(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [[x1, y1], [x2, y2]],
+                    },
+                    "properties": {"kind": "edge"},
+                }
+            )
+
+    def binary_buffers(self):
+        """
+        The binary layout as a list of buffers, so they can be handed to a
+        socket or file with writelines and no intermediate copy. The header
+        is followed by edges (float32 x4), sites (float32 x2), cell offsets
+        (uint32, n_cells + 1) and cell vertices (float32 x2), little-endian.
+        Returns:
+            list of bytes-like objects
+        """
+        edges = np.ascontiguousarray(self.edges, dtype="<f4")
+        sites = np.ascontiguousarray(self.sites, dtype="<f4")
+        offsets = np.ascontiguousarray(self.cell_offsets, dtype="<u4")
+        vertices = np.ascontiguousarray(self.cell_vertices, dtype="<f4")
+        header = _HEADER.pack(
+            BINARY_MAGIC, BINARY_VERSION, len(edges), len(sites), len(vertices)
+        )
+        return [header] + [
+            memoryview(a).cast("B") for a in (edges, sites, offsets, vertices)
+        ]
+
+    def write_binary(self, fp):
+        """
+        Writes the binary layout described in binary_buffers
+        Arguments:
+            fp: binary file-like object to write to
+        Returns:
+            None
+        """
+        fp.writelines(self.binary_buffers())
+
+    @classmethod
+    def from_binary(cls, source):
+        """
+        Reads the binary layout without copying the arrays
+        Arguments:
+            source: a path, which is memory-mapped, or a bytes-like object
+        Returns:
+            a VoronoiDiagram whose float32 arrays are views into source
+        Raises:
+            ValueError if source is not in the binary layout
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            buffer = np.frombuffer(source, dtype=np.uint8)
+        else:
+            buffer = np.memmap(source, dtype=np.uint8, mode="r")
+        if len(buffer) < _HEADER.size:
+            raise ValueError("buffer is too short for a Voronoi diagram header")
+        magic, version, n_edges, n_cells, n_vertices = _HEADER.unpack_from(
+            buffer[: _HEADER.size].tobytes()
+        )
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError(f"not a version {BINARY_VERSION} Voronoi diagram")
+
+        arrays = []
+        offset = _HEADER.size
+        for dtype, shape in (
+            ("<f4", (n_edges, 4)),
+            ("<f4", (n_cells, 2)),
+            ("<u4", (n_cells + 1,)),
+            ("<f4", (n_vertices, 2)),
+        ):
+            count = int(np.prod(shape))
+            arrays.append(
+                np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(
+                    shape
+                )
+            )
+            offset += count * 4
+        return cls(*arrays)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
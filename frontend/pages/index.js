@@ -2,10 +2,11 @@
 import { useEffect, useRef } from "react";
 import * as d3 from "d3";
 import * as topojson from "topojson-client";
-import { geoVoronoi } from "d3-geo-voronoi"; // TODO- Replace with file reading
 
 import styles from "../styles/Home.module.css";
 
+const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || "http://localhost:8080";
+
 export default function Home() {
   const globeRef = useRef(null);
   const mapRef = useRef(null);
@@ -91,12 +92,12 @@ async function renderMap(container, type = "globe") {
 
   // Draw Voronoi cells
   const seeds = airports.map(airport => [airport.lon, airport.lat]);
-  console.log("Generating Voronoi diagram with", seeds.length, "seeds");
-  const voronoi = geoVoronoi(seeds);
+  console.log("Requesting Voronoi diagram with", seeds.length, "seeds");
+  const voronoi = await fetchVoronoi(seeds);
   svg.append("g")
     .attr("class", styles.voronoiGroup)
     .selectAll("path")
-    .data(voronoi.polygons().features)
+    .data(voronoi.features)
     .enter()
     .append('path')
     .attr('d', path)
@@ -109,6 +110,20 @@ async function renderMap(container, type = "globe") {
   refresh(svg, path);
 }
 
+/** --- Spherical Voronoi cells from the backend, as a GeoJSON FeatureCollection --- **/
+async function fetchVoronoi(seeds) {
+  const response = await fetch(`${BACKEND_URL}/voronoi`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ points: seeds, lonlat: true }),
+  });
+  if (!response.ok) {
+    console.error("Voronoi request failed:", response.status, await response.text());
+    return { type: "FeatureCollection", features: [] };
+  }
+  return response.json();
+}
+
 function filter_far_side(svg, projection) {
   svg.selectAll("circle")
     .attr("display", d => {